@@ -0,0 +1,128 @@
+# File: backend/ai_client.py
+"""
+Reusable client for Gemini study suggestions.
+
+The model is configured once per process. Every call runs on a small thread
+pool with a hard deadline, and a circuit breaker stops calling the API for a
+cooldown period after repeated failures. Request handlers use
+generate_async() so they never wait on the LLM.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+SIMULATED_SUGGESTION = "1. Review notes from your weakest subject.\n2. Do a 20-minute practice session."
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; after `cooldown` seconds one
+    trial call is let through (half-open) and its result closes or re-opens it."""
+
+    def __init__(self, threshold=3, cooldown=60.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                # Half-open: let this call through, block others until it reports back
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class AIClient:
+    def __init__(self, api_key=None, model_name='gemini-1.5-flash-latest', timeout=8.0,
+                 failure_threshold=3, cooldown=60.0, max_workers=2, generator=None):
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold, cooldown)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-client')
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._model = None
+        if generator is not None:
+            self._generate = generator
+        elif not api_key or api_key == "YOUR_API_KEY_HERE":
+            print("WARNING: Using simulated AI. Please add your Gemini API Key.")
+            self._generate = lambda prompt: SIMULATED_SUGGESTION
+        else:
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            self._model = genai.GenerativeModel(model_name)
+            self._generate = self._generate_gemini
+
+    def _generate_gemini(self, prompt):
+        response = self._model.generate_content(prompt, request_options={"timeout": self.timeout})
+        return response.text.replace('*', '').replace('#', '')
+
+    def _call(self, prompt):
+        try:
+            text = self._generate(prompt)
+        except Exception as e:
+            print("Error calling Gemini API: " + str(e))
+            self.breaker.record_failure()
+            return None
+        self.breaker.record_success()
+        return text
+
+    def generate(self, prompt):
+        """Blocking call bounded by the deadline. Returns None on timeout, error
+        or while the circuit is open."""
+        if not self.breaker.allow():
+            return None
+        future = self._executor.submit(self._call, prompt)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self.breaker.record_failure()
+            return None
+
+    def generate_async(self, key, prompt, callback):
+        """Generate in the background and pass the text to `callback` on success.
+        Requests for a key that is already in flight are dropped."""
+        with self._pending_lock:
+            if key in self._pending or not self.breaker.allow():
+                return False
+            self._pending.add(key)
+
+        def run():
+            try:
+                text = self._call(prompt)
+                if text is not None:
+                    callback(text)
+            finally:
+                with self._pending_lock:
+                    self._pending.discard(key)
+
+        self._executor.submit(run)
+        return True
+
+
+def fallback_suggestions(user, attendance_data):
+    """Rule-based tasks used until an AI suggestion is available."""
+    tasks = []
+    low = [s for s, stats in attendance_data.get("subject_stats", {}).items() if stats["percentage"] < 75]
+    if user.weak_subjects:
+        tasks.append(f"Review today's notes for {user.weak_subjects.split(',')[0].strip()}.")
+    if low:
+        tasks.append(f"Catch up on missed material in {low[0]} and attend every class this week.")
+    tasks.append("Do a 20-minute practice session on a topic from today's classes.")
+    if user.career_goal:
+        tasks.append(f"Spend 30 minutes on a small project towards becoming a {user.career_goal}.")
+    return "\n".join(f"{i}. {task}" for i, task in enumerate(tasks[:3], start=1))
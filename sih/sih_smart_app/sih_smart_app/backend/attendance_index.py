@@ -0,0 +1,188 @@
+# File: backend/attendance_index.py
+"""
+Incremental at-risk index.
+
+AttendanceCounter keeps running (total, present) counts per student and
+subject and AttendanceSummary the overall counts per student, together with
+the student's institution, branch and semester. AttendanceMonthly holds the
+same counts per student, class and calendar month, the rollup behind
+date-range aggregates (attendance_stats.window_counts). Write paths pass the status
+changes they made to apply_changes() inside their own transaction, so the
+counters move with the records. "Students below X%" is then a range scan
+over an (institution|branch|semester, percentage) index instead of a scan
+of every attendance record.
+
+rebuild() recomputes all three tables from AttendanceRecord; run it after bulk
+loads that bypass the write paths (`flask rebuild-attendance-index`).
+dedupe_records() removes duplicate marks written before AttendanceRecord had
+its unique (student_id, class_id, date) index; the app runs it at startup
+until that index exists. The app also runs rebuild() at startup when
+AttendanceMonthly is empty but attendance has been recorded, as in a
+database that predates the rollup.
+"""
+from datetime import date
+
+from sqlalchemy import bindparam, case, delete, extract, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from attendance_stats import TARGET_PERCENTAGE, classes_needed
+from models import db, AttendanceCounter, AttendanceMonthly, AttendanceRecord, AttendanceSummary, ClassSchedule, Subject, User
+
+
+def _percentage(total, present):
+    return round(present / total * 100, 2) if total else 0.0
+
+
+def _apply_deltas(model, key_columns, deltas, new_row):
+    """Add (total, present) deltas to the rows of `model` keyed by `key_columns`,
+    creating missing rows with new_row(key)."""
+    table = model.__table__
+    keys = [dict(zip(key_columns, key)) for key in deltas]
+    where = [table.c[column] == bindparam(f"k_{column}") for column in key_columns]
+    values = {"total": table.c.total + bindparam('dt'), "present": table.c.present + bindparam('dp')}
+    has_percentage = 'percentage' in table.c
+    if has_percentage:
+        values["percentage"] = case((table.c.total + bindparam('dt') > 0,
+                                     func.round((table.c.present + bindparam('dp')) * 100.0 / (table.c.total + bindparam('dt')), 2)),
+                                    else_=0.0)
+    increment = update(table).where(*where).values(**values)
+    key_filter = [table.c[column].in_({key[column] for key in keys}) for column in key_columns]
+    existing = {tuple(row) for row in db.session.execute(select(*[table.c[c] for c in key_columns]).where(*key_filter))}
+
+    updates, inserts = [], {}
+    for key, (dt, dp) in deltas.items():
+        if key in existing:
+            updates.append({**{f"k_{c}": v for c, v in zip(key_columns, key)}, "dt": dt, "dp": dp})
+        else:
+            inserts[key] = {**new_row(key), "total": dt, "present": dp}
+            if has_percentage:
+                inserts[key]["percentage"] = _percentage(dt, dp)
+    if updates:
+        db.session.execute(increment, updates)
+    if inserts:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(table), list(inserts.values()))
+        except IntegrityError:
+            # Some rows were created concurrently: go round again, they now take the update path
+            _apply_deltas(model, key_columns, {key: deltas[key] for key in inserts}, new_row)
+
+
+def apply_changes(changes):
+    """`changes`: iterable of (student_id, subject_id, class_id, day, old_status,
+    new_status), old_status None for a new record. The caller commits."""
+    subject_deltas, student_deltas, month_deltas = {}, {}, {}
+    for student_id, subject_id, class_id, day, old_status, new_status in changes:
+        dt = 1 if old_status is None else 0
+        dp = (new_status == 'present') - (old_status == 'present')
+        if not dt and not dp:
+            continue
+        for deltas, key in ((subject_deltas, (student_id, subject_id)), (student_deltas, (student_id,)),
+                            (month_deltas, (student_id, class_id, day.replace(day=1)))):
+            total, present = deltas.get(key, (0, 0))
+            deltas[key] = (total + dt, present + dp)
+    if not student_deltas:
+        return
+
+    student_ids = [key[0] for key in student_deltas]
+    students = {user.id: user for user in db.session.query(User.id, User.institution_id, User.branch_id, User.current_semester_id)
+                .filter(User.id.in_(student_ids))}
+
+    _apply_deltas(AttendanceCounter, ('student_id', 'subject_id'), subject_deltas,
+                  lambda key: {"student_id": key[0], "subject_id": key[1]})
+    _apply_deltas(AttendanceSummary, ('student_id',), student_deltas,
+                  lambda key: {"student_id": key[0], "institution_id": students[key[0]].institution_id,
+                               "branch_id": students[key[0]].branch_id,
+                               "semester_id": students[key[0]].current_semester_id})
+    _apply_deltas(AttendanceMonthly, ('student_id', 'class_id', 'month'), month_deltas,
+                  lambda key: {"student_id": key[0], "class_id": key[1], "month": key[2]})
+
+
+def rebuild():
+    """Recompute the tables from AttendanceRecord with grouped queries."""
+    present = func.sum(case((AttendanceRecord.status == 'present', 1), else_=0))
+    rows = (db.session.query(AttendanceRecord.student_id, ClassSchedule.subject_id,
+                             func.count(AttendanceRecord.id), present)
+            .join(ClassSchedule, AttendanceRecord.class_id == ClassSchedule.id)
+            .group_by(AttendanceRecord.student_id, ClassSchedule.subject_id).all())
+    counters = [{"student_id": s, "subject_id": subj, "total": t, "present": int(p or 0), "percentage": _percentage(t, int(p or 0))}
+                for s, subj, t, p in rows]
+    totals = {}
+    for row in counters:
+        total, present_count = totals.get(row["student_id"], (0, 0))
+        totals[row["student_id"]] = (total + row["total"], present_count + row["present"])
+    users = db.session.query(User.id, User.institution_id, User.branch_id, User.current_semester_id).filter(User.role == 'student')
+    summaries = [{"student_id": u.id, "institution_id": u.institution_id, "branch_id": u.branch_id,
+                  "semester_id": u.current_semester_id, "total": totals.get(u.id, (0, 0))[0],
+                  "present": totals.get(u.id, (0, 0))[1], "percentage": _percentage(*totals.get(u.id, (0, 0)))}
+                 for u in users]
+
+    year, month = extract('year', AttendanceRecord.date), extract('month', AttendanceRecord.date)
+    monthly = [{"student_id": s, "class_id": c, "month": date(int(y), int(m), 1), "total": t, "present": int(p or 0)}
+               for s, c, y, m, t, p in db.session.query(AttendanceRecord.student_id, AttendanceRecord.class_id, year, month,
+                                                        func.count(AttendanceRecord.id), present)
+               .group_by(AttendanceRecord.student_id, AttendanceRecord.class_id, year, month)]
+
+    db.session.execute(delete(AttendanceCounter.__table__))
+    db.session.execute(delete(AttendanceSummary.__table__))
+    db.session.execute(delete(AttendanceMonthly.__table__))
+    if monthly:
+        db.session.execute(insert(AttendanceMonthly.__table__), monthly)
+    if counters:
+        db.session.execute(insert(AttendanceCounter.__table__), counters)
+    if summaries:
+        db.session.execute(insert(AttendanceSummary.__table__), summaries)
+    return len(summaries), len(counters)
+
+
+def dedupe_records():
+    """Delete all but the most recently written AttendanceRecord of each
+    (student, class, date). Returns how many were deleted; the counters
+    counted the duplicates, so rebuild() after. The caller commits."""
+    ranked = select(AttendanceRecord.id, func.row_number().over(
+        partition_by=(AttendanceRecord.student_id, AttendanceRecord.class_id, AttendanceRecord.date),
+        order_by=(AttendanceRecord.timestamp.desc().nulls_last(), AttendanceRecord.id.desc())).label('rank')).subquery()
+    duplicates = select(ranked.c.id).where(ranked.c.rank > 1)
+    return db.session.execute(delete(AttendanceRecord.__table__)
+                              .where(AttendanceRecord.__table__.c.id.in_(duplicates))).rowcount
+
+
+def move_student(student_id, semester_id):
+    """Keep the summary's semester in step with User.current_semester_id."""
+    AttendanceSummary.query.filter_by(student_id=student_id).update({"semester_id": semester_id})
+
+
+def students_below(threshold, institution_id, branch_id=None, semester_id=None, page=1, per_page=50):
+    """One page of students whose overall attendance is below `threshold`,
+    lowest first, with the subjects that are below it. Returns (items, total)."""
+    query = (db.session.query(AttendanceSummary, User.name, User.college_id)
+             .join(User, AttendanceSummary.student_id == User.id)
+             .filter(AttendanceSummary.institution_id == institution_id,
+                     AttendanceSummary.percentage < threshold, AttendanceSummary.total > 0))
+    if branch_id:
+        query = query.filter(AttendanceSummary.branch_id == branch_id)
+    if semester_id:
+        query = query.filter(AttendanceSummary.semester_id == semester_id)
+    total = query.count()
+    rows = (query.order_by(AttendanceSummary.percentage, AttendanceSummary.student_id)
+            .offset((page - 1) * per_page).limit(per_page).all())
+
+    low_subjects = {}
+    student_ids = [summary.student_id for summary, _, _ in rows]
+    if student_ids:
+        subject_rows = (db.session.query(AttendanceCounter.student_id, Subject.name, Subject.course_code, AttendanceCounter.percentage)
+                        .join(Subject, AttendanceCounter.subject_id == Subject.id)
+                        .filter(AttendanceCounter.student_id.in_(student_ids), AttendanceCounter.percentage < threshold)
+                        .order_by(AttendanceCounter.percentage).all())
+        for student_id, name, course_code, percentage in subject_rows:
+            low_subjects.setdefault(student_id, []).append({"subject": f"{name} ({course_code})", "percentage": percentage})
+
+    items = [{
+        "student_id": summary.student_id, "name": name, "college_id": college_id,
+        "branch_id": summary.branch_id, "semester_id": summary.semester_id,
+        "total_classes": summary.total, "present_classes": summary.present,
+        "overall_percentage": summary.percentage,
+        "classes_needed_for_75_percent": classes_needed(summary.present, summary.total, TARGET_PERCENTAGE),
+        "subjects_below": low_subjects.get(summary.student_id, [])
+    } for summary, name, college_id in rows]
+    return items, total
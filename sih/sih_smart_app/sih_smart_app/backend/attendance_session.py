@@ -0,0 +1,241 @@
+# File: backend/attendance_session.py
+"""
+Multi-photo attendance sessions.
+
+One shot rarely covers a large hall, so a session collects several photos
+of one ClassSchedule meeting (one session per class and date). Each photo
+is recognised by a background thread as soon as it is uploaded, so photos
+are processed in parallel while the teacher is still taking the next one;
+every embedded face is stored as a SessionFace with its nearest enrolled
+student of the class roster, matched or not.
+
+The same student usually appears in more than one photo. merge_faces()
+clusters the session's faces: faces from different photos closer than
+FACE_SESSION_MERGE_THRESHOLD are one person, two faces of the same photo
+never are. Each person is then recognised once, as the student their
+closest face matches, so overlapping photos neither count a student twice
+nor let one face mark two students. finalize() writes the result for the
+whole roster in one bulk insert/update.
+
+An upload lives only in the queue of the worker that received it, so a
+worker restart loses the photos it had not processed yet. expire_photos()
+marks photos still pending FACE_SESSION_PHOTO_TIMEOUT seconds after upload
+as failed, so the session can still be finalized (or the photo uploaded
+again); a worker that finishes one after that discards its result.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from attendance_index import apply_changes
+from face_detection import recognize_faces
+from face_enrollment import load_image
+from face_gallery import nearest
+from models import db, enrollments, AttendanceRecord, AttendanceSession, SessionFace, SessionPhoto, User
+
+PHOTO_LOST = "Processing was interrupted; upload the photo again"
+
+_pool = {'pid': None, 'executor': None}
+_pool_lock = threading.Lock()
+
+
+def _executor(workers):
+    with _pool_lock:
+        if _pool['pid'] != os.getpid():
+            _pool['executor'] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='attendance-session')
+            _pool['pid'] = os.getpid()
+        return _pool['executor']
+
+
+def class_allowed(claims, class_schedule):
+    if claims['role'] == 'teacher':
+        return class_schedule.teacher_id == claims['uid']
+    return class_schedule.teacher.institution_id == claims['inst']
+
+
+def open_session(class_schedule, day, user_id):
+    """(session, created): the session of `class_schedule` on `day`, created if needed."""
+    session = AttendanceSession.query.filter_by(class_id=class_schedule.id, date=day).first()
+    if session:
+        return session, False
+    try:
+        session = AttendanceSession(class_id=class_schedule.id, date=day, created_by=user_id)
+        db.session.add(session)
+        db.session.commit()
+        return session, True
+    except IntegrityError:
+        # Another request opened it first
+        db.session.rollback()
+        return AttendanceSession.query.filter_by(class_id=class_schedule.id, date=day).first(), False
+
+
+def add_photo(app, gallery, session, filename, data):
+    """Store a pending SessionPhoto and queue `data` (the encoded image) for recognition."""
+    photo = SessionPhoto(session_id=session.id, filename=filename)
+    db.session.add(photo)
+    db.session.commit()
+    _executor(app.config['FACE_SESSION_WORKERS']).submit(_process_photo, app, gallery, photo.id, data)
+    return photo
+
+
+def _process_photo(app, gallery, photo_id, data):
+    # Runs in the session thread pool, outside any request
+    with app.app_context():
+        photo = db.session.get(SessionPhoto, photo_id)
+        try:
+            image = load_image(data)
+            if image is None:
+                raise ValueError("Unreadable image")
+            embeddings, _ = recognize_faces(image, app.config)
+            roster = roster_ids(db.session.get(AttendanceSession, photo.session_id).class_schedule)
+            matches = nearest(gallery.current(), embeddings, app.config['FACE_GALLERY_CANDIDATES'], allowed=roster)
+            if matches:
+                db.session.execute(insert(SessionFace.__table__), [
+                    {"session_id": photo.session_id, "photo_id": photo.id, "embedding": embedding.tobytes(),
+                     "student_id": student_id, "distance": distance}
+                    for embedding, (student_id, distance) in zip(embeddings, matches)])
+            _settle(photo_id, status='processed', faces=len(embeddings))
+        except Exception as e:
+            db.session.rollback()
+            _settle(photo_id, status='failed', message=str(e)[:255])
+
+
+def _settle(photo_id, **values):
+    # Only a photo still pending: one expired meanwhile keeps its failure, and its faces are dropped
+    table = SessionPhoto.__table__
+    if db.session.execute(update(table).where(table.c.id == photo_id, table.c.status == 'pending')
+                          .values(**values)).rowcount:
+        db.session.commit()
+    else:
+        db.session.rollback()
+
+
+def expire_photos(session_id, timeout):
+    """Mark the session's photos pending for more than `timeout` seconds as failed."""
+    table = SessionPhoto.__table__
+    expired = db.session.execute(update(table).where(
+        table.c.session_id == session_id, table.c.status == 'pending',
+        table.c.created_at < datetime.utcnow() - timedelta(seconds=timeout)).values(status='failed', message=PHOTO_LOST)).rowcount
+    if expired:
+        db.session.commit()
+    return expired
+
+
+def wait_for_photos(session_id, timeout, photo_timeout):
+    """Wait until no photo of the session is pending; returns how many still are.
+    Photos pending longer than `photo_timeout` seconds are failed, not waited for."""
+    deadline = time.monotonic() + timeout
+    while True:
+        expire_photos(session_id, photo_timeout)
+        pending = SessionPhoto.query.filter_by(session_id=session_id, status='pending').count()
+        if not pending or time.monotonic() >= deadline:
+            return pending
+        # Photos may be processed by another worker; only the database tells
+        db.session.rollback()
+        time.sleep(0.2)
+
+
+def merge_faces(photo_ids, embeddings, threshold):
+    """Cluster label of every face. Closest pairs merge first, and two clusters
+    merge only if they share no photo, since a photo shows everyone once."""
+    count = len(photo_ids)
+    if not count:
+        return []
+    matrix = np.vstack(embeddings)
+    distances = 1.0 - matrix @ matrix.T
+    parent = list(range(count))
+    photos = [{photo_id} for photo_id in photo_ids]
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows, cols = np.nonzero(np.triu(distances <= threshold, k=1))
+    for i, j in sorted(zip(rows.tolist(), cols.tolist()), key=lambda pair: distances[pair]):
+        a, b = find(i), find(j)
+        if a == b or photos[a] & photos[b]:
+            continue
+        parent[b] = a
+        photos[a] |= photos[b]
+    return [find(i) for i in range(count)]
+
+
+def roster_ids(class_schedule):
+    semester_id = class_schedule.subject.semester_id
+    return {user_id for (user_id,) in db.session.query(enrollments.c.user_id)
+            .filter(enrollments.c.semester_id == semester_id)}
+
+
+def session_result(session, config):
+    """Who the session's photos show so far: present student ids (enrolled in
+    the class) and counts of people seen, recognised and unknown."""
+    faces = SessionFace.query.filter_by(session_id=session.id).all()
+    labels = merge_faces([f.photo_id for f in faces], [np.frombuffer(f.embedding, dtype=np.float32) for f in faces],
+                         config['FACE_SESSION_MERGE_THRESHOLD'])
+    best = {}
+    for face, label in zip(faces, labels):
+        if label not in best or face.distance < best[label].distance:
+            best[label] = face
+    recognised = {face.student_id for face in best.values() if face.distance <= config['FACE_MATCH_THRESHOLD']}
+    roster = roster_ids(session.class_schedule)
+    return {"present_ids": sorted(recognised & roster), "faces": len(faces), "people": len(best),
+            "recognized": len(recognised), "not_enrolled": len(recognised - roster),
+            "unknown": sum(face.distance > config['FACE_MATCH_THRESHOLD'] for face in best.values())}
+
+
+def finalize(session, present_ids, overrides=None):
+    """Write present/absent for the class roster in one bulk insert and update.
+    `overrides` ({student_id: present}) are the teacher's corrections. Returns
+    (present, absent, student_ids), or None if the session was already
+    finalized; the caller bumps stamps and commits."""
+    now = datetime.utcnow()
+    # Claiming the session first makes a concurrent finalize of the same session a no-op
+    table = AttendanceSession.__table__
+    claimed = db.session.execute(update(table).where(table.c.id == session.id, table.c.status == 'open')
+                                 .values(status='finalized', finalized_at=now)).rowcount
+    if not claimed:
+        return None
+    class_schedule = session.class_schedule
+    roster = roster_ids(class_schedule)
+    marks = {student_id: student_id in present_ids for student_id in roster}
+    marks.update({student_id: present for student_id, present in (overrides or {}).items() if student_id in roster})
+    existing = {r.student_id: r for r in db.session.query(AttendanceRecord.id, AttendanceRecord.student_id,
+                                                             AttendanceRecord.status)
+                .filter_by(class_id=class_schedule.id, date=session.date)}
+    new_rows, changed_rows, changes = [], [], []
+    for student_id, is_present in marks.items():
+        status = "present" if is_present else "absent"
+        record = existing.get(student_id)
+        if record is None:
+            new_rows.append({"student_id": student_id, "class_id": class_schedule.id, "date": session.date,
+                             "status": status, "timestamp": now})
+        else:
+            changed_rows.append({"record_id": record.id, "status": status, "timestamp": now})
+        changes.append((student_id, class_schedule.subject_id, class_schedule.id, session.date,
+                        record.status if record else None, status))
+    if new_rows:
+        db.session.execute(insert(AttendanceRecord.__table__), new_rows)
+    if changed_rows:
+        table = AttendanceRecord.__table__
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('record_id'))
+            .values(status=bindparam('status'), timestamp=bindparam('timestamp')),
+            changed_rows
+        )
+    apply_changes(changes)
+    present = sum(marks.values())
+    return present, len(marks) - present, list(marks)
+
+
+def present_students(student_ids):
+    if not student_ids:
+        return []
+    return [{"id": s.id, "name": s.name} for s in User.query.filter(User.id.in_(student_ids)).order_by(User.name)]
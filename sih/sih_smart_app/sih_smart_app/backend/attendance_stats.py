@@ -0,0 +1,175 @@
+# File: backend/attendance_stats.py
+"""
+Attendance aggregates shared by the stats endpoint and batch jobs.
+
+Counts are computed in SQL grouped by student and subject, so a whole
+semester of students costs one query instead of one query per record.
+
+window_counts() answers the same totals for a date range and/or semester.
+Whole calendar months inside the range come from the AttendanceMonthly
+rollup and only the partial months at its edges are read from
+AttendanceRecord, through its (student_id, date) and (class_id, date)
+indexes, so the cost follows the length of the window rather than the
+length of the history.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func
+
+from models import db, AttendanceMonthly, AttendanceRecord, ClassSchedule, Subject, User
+
+TARGET_PERCENTAGE = 75
+
+
+def subject_attendance_counts(*criteria):
+    """Return {student_id: {"Subject (CODE)": (total, present)}} for the
+    attendance records matching `criteria` (User/AttendanceRecord columns)."""
+    present = func.sum(case((AttendanceRecord.status == 'present', 1), else_=0))
+    rows = (
+        db.session.query(
+            AttendanceRecord.student_id, Subject.name, Subject.course_code,
+            func.count(AttendanceRecord.id), present
+        )
+        .join(ClassSchedule, AttendanceRecord.class_id == ClassSchedule.id)
+        .join(Subject, ClassSchedule.subject_id == Subject.id)
+        .join(User, AttendanceRecord.student_id == User.id)
+        .filter(*criteria)
+        .group_by(AttendanceRecord.student_id, Subject.id)
+        .all()
+    )
+    counts = {}
+    for student_id, name, course_code, total, present_count in rows:
+        counts.setdefault(student_id, {})[f"{name} ({course_code})"] = (total, int(present_count or 0))
+    return counts
+
+
+def classes_needed(present_classes, total_classes, target=TARGET_PERCENTAGE):
+    # Smallest x with (present + x) / (total + x) >= target
+    ratio = target / 100
+    numerator = (ratio * total_classes) - present_classes
+    if numerator > 0:
+        return int(numerator / (1 - ratio)) + 1
+    return 0
+
+
+def summarize_attendance(subject_counts):
+    """Build the attendance/stats response body from per-subject (total, present) counts."""
+    subject_stats = {}
+    for subject_key, (total, present) in subject_counts.items():
+        subject_stats[subject_key] = {
+            "total": total,
+            "present": present,
+            "percentage": round((present / total) * 100, 2) if total > 0 else 0
+        }
+    total_classes = sum(total for total, _ in subject_counts.values())
+    present_classes = sum(present for _, present in subject_counts.values())
+    overall_percentage = round((present_classes / total_classes) * 100, 2) if total_classes > 0 else 0
+
+    needed = 0
+    if overall_percentage < TARGET_PERCENTAGE and total_classes > 0:
+        needed = classes_needed(present_classes, total_classes)
+
+    return {
+        "overall_percentage": overall_percentage,
+        "total_classes": total_classes,
+        "present_classes": present_classes,
+        "classes_needed_for_75_percent": needed,
+        "subject_stats": subject_stats
+    }
+
+
+def window_from_args(args):
+    """{date_from, date_to, semester_id} from the `from`, `to` and `semester_id`
+    query arguments; raises ValueError on malformed ones."""
+    window = {"date_from": None, "date_to": None, "semester_id": None}
+    for arg, name in (('from', 'date_from'), ('to', 'date_to')):
+        if args.get(arg):
+            try:
+                window[name] = datetime.strptime(args[arg], '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError(f"Invalid '{arg}' date. Use YYYY-MM-DD")
+    if window["date_from"] and window["date_to"] and window["date_from"] > window["date_to"]:
+        raise ValueError("'from' is after 'to'")
+    if args.get('semester_id'):
+        try:
+            window["semester_id"] = int(args['semester_id'])
+        except ValueError:
+            raise ValueError("semester_id must be an integer")
+    return window
+
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def split_window(date_from=None, date_to=None):
+    """Split [date_from, date_to] (None: open) into ((first_month, last_month), edges):
+    the whole months to read from the rollup, or None if there are none, and the
+    (start, end) day ranges left over at either end."""
+    first = date_from if date_from is None or date_from.day == 1 else _next_month(date_from)
+    last = None
+    if date_to is not None:
+        month = date_to.replace(day=1)
+        last = month if _next_month(date_to) - timedelta(days=1) == date_to else (month - timedelta(days=1)).replace(day=1)
+    if first is not None and last is not None and first > last:
+        return None, [(date_from, date_to)]
+    edges = []
+    if date_from is not None and date_from != first:
+        edges.append((date_from, first - timedelta(days=1)))
+    if date_to is not None and last != date_to.replace(day=1):
+        edges.append((date_to.replace(day=1), date_to))
+    return (first, last), edges
+
+
+def _scoped(query, source, student_id, class_ids, semester_id):
+    query = query.join(ClassSchedule, source.class_id == ClassSchedule.id)
+    if student_id is not None:
+        query = query.filter(source.student_id == student_id)
+    if class_ids is not None:
+        query = query.filter(source.class_id.in_(class_ids))
+    if semester_id is not None:
+        query = query.join(Subject, ClassSchedule.subject_id == Subject.id).filter(Subject.semester_id == semester_id)
+    return query
+
+
+def window_counts(keys, student_id=None, class_ids=None, semester_id=None, date_from=None, date_to=None):
+    """Return {key tuple: (total, present)} grouped by `keys` (any of
+    'student_id', 'class_id', 'subject_id') for one student and/or a set of
+    classes, optionally limited to a semester and a date range."""
+    months, edges = split_window(date_from, date_to)
+    counts = {}
+
+    def add(rows):
+        for *key, total, present in rows:
+            old_total, old_present = counts.get(tuple(key), (0, 0))
+            counts[tuple(key)] = (old_total + int(total), old_present + int(present or 0))
+
+    if months is not None:
+        columns = {'student_id': AttendanceMonthly.student_id, 'class_id': AttendanceMonthly.class_id,
+                   'subject_id': ClassSchedule.subject_id}
+        group = [columns[k] for k in keys]
+        query = _scoped(db.session.query(*group, func.sum(AttendanceMonthly.total), func.sum(AttendanceMonthly.present)),
+                        AttendanceMonthly, student_id, class_ids, semester_id)
+        if months[0] is not None:
+            query = query.filter(AttendanceMonthly.month >= months[0])
+        if months[1] is not None:
+            query = query.filter(AttendanceMonthly.month <= months[1])
+        add(query.group_by(*group))
+
+    columns = {'student_id': AttendanceRecord.student_id, 'class_id': AttendanceRecord.class_id,
+               'subject_id': ClassSchedule.subject_id}
+    group = [columns[k] for k in keys]
+    present = func.sum(case((AttendanceRecord.status == 'present', 1), else_=0))
+    for start, end in edges:
+        query = _scoped(db.session.query(*group, func.count(AttendanceRecord.id), present),
+                        AttendanceRecord, student_id, class_ids, semester_id)
+        add(query.filter(AttendanceRecord.date.between(start, end)).group_by(*group))
+    return counts
+
+
+def student_window_counts(student_id, **window):
+    """{"Subject (CODE)": (total, present)} for one student within `window`."""
+    counts = window_counts(('subject_id',), student_id=student_id, **window)
+    subjects = Subject.query.filter(Subject.id.in_([key[0] for key in counts])).all() if counts else []
+    labels = {subject.id: f"{subject.name} ({subject.course_code})" for subject in subjects}
+    return {labels[key[0]]: value for key, value in counts.items()}
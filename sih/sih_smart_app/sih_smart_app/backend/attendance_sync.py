@@ -0,0 +1,259 @@
+# File: backend/attendance_sync.py
+"""
+Batch sync of attendance captured offline.
+
+A batch holds many classes' attendance, each item tagged with a client
+generated idempotency key and the time it was captured. The whole batch is
+applied in one transaction: receipts, classes, enrollments and existing
+records are each loaded with a single query, new records are bulk inserted
+and changed ones bulk updated. Keys already in SyncReceipt are reported as
+duplicates without touching attendance, so a client can resend a batch
+until it gets an answer. When a record was changed after the item was
+captured, the newer mark wins and the item reports it as stale.
+
+captured_at must carry a UTC offset (e.g. "2025-01-06T09:05:00+05:30"):
+offline devices keep local time, and a naive value could not be ordered
+against the records' UTC timestamps.
+
+New records are inserted with ON CONFLICT DO NOTHING against the unique
+(student_id, class_id, date) index. If save_attendance or another sync
+created one of them after the batch read the table, ConcurrentInsert is
+raised; the caller rolls back and applies the batch again, which now sees
+those records and updates them, newest mark first.
+
+save_attendance uses the same split: plan_save() reads the class's records
+in the request and save_planned() writes any number of planned saves with
+one insert, one update and one counter update (see write_queue.py).
+"""
+from datetime import date, datetime, timezone
+
+from sqlalchemy import bindparam, insert, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from attendance_index import apply_changes
+from models import db, enrollments, AttendanceRecord, ClassSchedule, Subject, SyncReceipt, User
+
+MAX_KEY_LENGTH = 64
+RECORD_KEY = ('student_id', 'class_id', 'date')
+
+
+class ConcurrentInsert(Exception):
+    """Another transaction created records this batch was about to insert,
+    or changed the status of records a planned save was about to update."""
+
+
+def _insert_new_records(rows):
+    """Insert `rows` into AttendanceRecord, skipping any whose (student, class,
+    date) exists; returns how many were inserted."""
+    dialect_insert = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}.get(db.session.get_bind().dialect.name)
+    if dialect_insert is None:
+        # No portable upsert: a conflict raises IntegrityError, which the caller also retries
+        db.session.execute(insert(AttendanceRecord.__table__), rows)
+        return len(rows)
+    table = AttendanceRecord.__table__
+    statement = dialect_insert(table).on_conflict_do_nothing(index_elements=RECORD_KEY).returning(table.c.id)
+    return len(db.session.execute(statement, rows).all())
+
+
+def plan_save(class_id, subject_id, marks, day):
+    """Read the class's records for `day` once and turn `marks` ({student_id:
+    present}) into plain rows for save_planned(): (new rows, changed rows,
+    status changes for apply_changes)."""
+    existing = {student_id: (record_id, status) for student_id, record_id, status in
+                db.session.query(AttendanceRecord.student_id, AttendanceRecord.id, AttendanceRecord.status)
+                .filter_by(class_id=class_id, date=day)}
+    now = datetime.utcnow()
+    new_rows, changed_rows, changes = [], [], []
+    for student_id, is_present in marks.items():
+        status = "present" if is_present else "absent"
+        record_id, old_status = existing.get(student_id, (None, None))
+        if record_id is None:
+            new_rows.append({"student_id": student_id, "class_id": class_id, "date": day,
+                             "status": status, "timestamp": now})
+        else:
+            changed_rows.append({"record_id": record_id, "old_status": old_status, "status": status, "timestamp": now})
+        changes.append((student_id, subject_id, class_id, day, old_status, status))
+    return new_rows, changed_rows, changes
+
+
+def _write_planned(plans):
+    new_rows = [row for rows, _, _ in plans for row in rows]
+    changed_rows = [row for _, rows, _ in plans for row in rows]
+    if new_rows and _insert_new_records(new_rows) < len(new_rows):
+        raise ConcurrentInsert()
+    if changed_rows:
+        table = AttendanceRecord.__table__
+        updated = db.session.execute(
+            update(table).where(table.c.id == bindparam('record_id'), table.c.status == bindparam('old_status'))
+            .values(status=bindparam('status'), timestamp=bindparam('timestamp')),
+            changed_rows
+        ).rowcount
+        if updated < len(changed_rows):
+            raise ConcurrentInsert()
+    apply_changes(change for _, _, changes in plans for change in changes)
+
+
+def save_planned(plans):
+    """Write the plan_save() results in `plans` with one insert and one update
+    for all their rows, and one apply_changes(). If a record appeared or
+    changed status after its plan read it (two saves of one class in the same
+    batch, or another writer), each save is planned again and written in
+    order, so the last one wins as if they had been written one by one.
+    Raises ConcurrentInsert if records still change under the new plans. The
+    caller commits."""
+    try:
+        with db.session.begin_nested():
+            _write_planned(plans)
+    except ConcurrentInsert:
+        for _, _, changes in plans:
+            if not changes:
+                continue
+            _, subject_id, class_id, day, _, _ = changes[0]
+            marks = {student_id: status == "present" for student_id, *_rest, status in changes}
+            _write_planned([plan_save(class_id, subject_id, marks, day)])
+
+
+def _parse_item(item, today):
+    """Return (key, class_id, day, captured_at, {student_id: present}) or raise ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError("Item must be an object")
+    key = item.get('idempotency_key')
+    if not isinstance(key, str) or not key or len(key) > MAX_KEY_LENGTH:
+        raise ValueError(f"idempotency_key must be a string of 1-{MAX_KEY_LENGTH} characters")
+    class_id = item.get('class_id')
+    if not isinstance(class_id, int):
+        raise ValueError("class_id must be an integer")
+    day = datetime.strptime(item.get('date') or '', '%Y-%m-%d').date()
+    if day > today:
+        raise ValueError("date is in the future")
+    captured_at = datetime.utcnow()
+    if item.get('captured_at'):
+        captured_at = datetime.fromisoformat(item['captured_at'])
+        if captured_at.tzinfo is None:
+            raise ValueError("captured_at needs a UTC offset, e.g. 2025-01-06T09:05:00+05:30")
+        # Records store naive UTC timestamps
+        captured_at = captured_at.astimezone(timezone.utc).replace(tzinfo=None)
+    attendance = item.get('attendance')
+    if not isinstance(attendance, dict) or not attendance:
+        raise ValueError("attendance must map student ids to true/false")
+    marks = {int(student_id): bool(present) for student_id, present in attendance.items()}
+    return key, class_id, day, captured_at, marks
+
+
+def _class_allowed(claims, class_schedule, teacher_institution):
+    if claims['role'] == 'teacher':
+        return class_schedule.teacher_id == claims['uid']
+    return teacher_institution == claims['inst']
+
+
+def apply_sync_batch(items, claims, today=None):
+    """Apply `items` for the user in `claims` and return (results, applied).
+    `results` has one entry per item in request order; `applied` lists
+    (class_schedule, day, present, absent, student_ids) for each applied
+    item. Raises ConcurrentInsert when records appeared while the batch was
+    applied; the caller rolls back and retries. The caller commits."""
+    today = today or date.today()
+    results = [None] * len(items)
+    parsed = {}
+    for i, item in enumerate(items):
+        try:
+            parsed[i] = _parse_item(item, today)
+        except (ValueError, TypeError) as e:
+            key = item.get('idempotency_key') if isinstance(item, dict) else None
+            results[i] = {"idempotency_key": key, "status": "rejected", "message": str(e)}
+
+    # Duplicates: already applied earlier, or repeated within this batch
+    keys = {p[0] for p in parsed.values()}
+    receipts = {}
+    if keys:
+        receipts = {r.idempotency_key: r for r in SyncReceipt.query.filter(
+            SyncReceipt.user_id == claims['uid'], SyncReceipt.idempotency_key.in_(keys))}
+    seen = set()
+    for i, (key, *_rest) in list(parsed.items()):
+        if key in receipts or key in seen:
+            receipt = receipts.get(key)
+            results[i] = {"idempotency_key": key, "status": "duplicate", "saved": receipt.saved if receipt else 0}
+            del parsed[i]
+        seen.add(key)
+
+    class_ids = {p[1] for p in parsed.values()}
+    classes = {}
+    if class_ids:
+        rows = (db.session.query(ClassSchedule, Subject.semester_id, User.institution_id)
+                .join(Subject, ClassSchedule.subject_id == Subject.id)
+                .join(User, ClassSchedule.teacher_id == User.id)
+                .filter(ClassSchedule.id.in_(class_ids)).all())
+        classes = {cs.id: (cs, semester_id, institution_id) for cs, semester_id, institution_id in rows}
+    for i, (key, class_id, *_rest) in list(parsed.items()):
+        entry = classes.get(class_id)
+        if entry is None or not _class_allowed(claims, entry[0], entry[2]):
+            results[i] = {"idempotency_key": key, "status": "rejected", "message": "Class not found"}
+            del parsed[i]
+
+    # Only students enrolled in the class's semester can be marked
+    semester_ids = {classes[p[1]][1] for p in parsed.values()}
+    enrolled = set()
+    if semester_ids:
+        enrolled = set(db.session.query(enrollments.c.semester_id, enrollments.c.user_id)
+                       .filter(enrollments.c.semester_id.in_(semester_ids)).all())
+
+    pairs = {(p[1], p[2]) for p in parsed.values()}
+    existing = {}
+    # Status before this batch, for the at-risk counters (None: no record yet)
+    original_status, final_status = {}, {}
+    if pairs:
+        rows = (db.session.query(AttendanceRecord.id, AttendanceRecord.student_id, AttendanceRecord.class_id,
+                                 AttendanceRecord.date, AttendanceRecord.timestamp, AttendanceRecord.status)
+                .filter(tuple_(AttendanceRecord.class_id, AttendanceRecord.date).in_(pairs)).all())
+        for r in rows:
+            existing[(r.student_id, r.class_id, r.date)] = (r.id, r.timestamp)
+            original_status[(r.student_id, r.class_id, r.date)] = r.status
+
+    new_rows, changed_rows, new_receipts, applied = {}, [], [], []
+    for i in sorted(parsed):
+        key, class_id, day, captured_at, marks = parsed[i]
+        class_schedule, semester_id, _ = classes[class_id]
+        saved = stale = ignored = present = absent = 0
+        student_ids = []
+        for student_id, is_present in marks.items():
+            if (semester_id, student_id) not in enrolled:
+                ignored += 1
+                continue
+            status = "present" if is_present else "absent"
+            record_key = (student_id, class_id, day)
+            current = existing.get(record_key)
+            if current is not None and current[1] is not None and current[1] > captured_at:
+                stale += 1
+                continue
+            if current is None or current[0] is None:
+                # Not in the table yet; a later item of this batch replaces the pending row
+                new_rows[record_key] = {"student_id": student_id, "class_id": class_id, "date": day,
+                                        "status": status, "timestamp": captured_at}
+            else:
+                changed_rows.append({"record_id": current[0], "status": status, "timestamp": captured_at})
+            # Later items in the same batch compare against this mark
+            existing[record_key] = (current[0] if current else None, captured_at)
+            final_status[record_key] = (class_schedule.subject_id, status)
+            saved += 1
+            student_ids.append(student_id)
+            present += is_present
+            absent += not is_present
+        new_receipts.append({"user_id": claims['uid'], "idempotency_key": key, "class_id": class_id,
+                             "date": day, "saved": saved, "applied_at": datetime.utcnow()})
+        results[i] = {"idempotency_key": key, "status": "applied", "saved": saved, "stale": stale, "ignored": ignored}
+        applied.append((class_schedule, day, present, absent, student_ids))
+
+    if new_rows and _insert_new_records(list(new_rows.values())) < len(new_rows):
+        raise ConcurrentInsert()
+    if changed_rows:
+        table = AttendanceRecord.__table__
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('record_id'))
+            .values(status=bindparam('status'), timestamp=bindparam('timestamp')),
+            changed_rows
+        )
+    if new_receipts:
+        db.session.execute(insert(SyncReceipt.__table__), new_receipts)
+    apply_changes((key[0], subject_id, key[1], key[2], original_status.get(key), status)
+                  for key, (subject_id, status) in final_status.items())
+    return results, applied
@@ -0,0 +1,124 @@
+# File: backend/auth.py
+"""
+Password hashing and signed session tokens.
+
+PASSWORD_HASH_METHOD selects the hash: 'bcrypt:<cost>' uses bcrypt when it is
+installed, anything else ('pbkdf2:sha256:600000', 'scrypt:32768:8:1') is handed
+to Werkzeug. Rows that still hold plaintext or an older method are accepted
+once and re-hashed on the next successful login.
+
+Tokens are signed with SECRET_KEY and carry the user id, role and institution,
+so decorated routes check identity without touching the database. Anyone who
+knows the key can mint an admin token for any institution, so it must be set
+to a private value: create_app() refuses to start without one.
+"""
+import hmac
+from functools import lru_cache, wraps
+
+from flask import current_app, g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash, generate_password_hash
+
+try:
+    import bcrypt
+except ImportError:  # pragma: no cover - optional dependency
+    bcrypt = None
+
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+WERKZEUG_PREFIXES = ('pbkdf2:', 'scrypt:')
+TOKEN_SALT = 'omniattend-auth'
+# The default this project used to ship; it is public
+INSECURE_SECRET_KEYS = ('a-very-secret-key',)
+
+
+def _method(method=None):
+    return method or current_app.config['PASSWORD_HASH_METHOD']
+
+
+def hash_password(password, method=None):
+    method = _method(method)
+    if method.startswith('bcrypt'):
+        if bcrypt is None:
+            raise RuntimeError("PASSWORD_HASH_METHOD is bcrypt but the bcrypt package is not installed")
+        cost = int(method.partition(':')[2] or 12)
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=cost)).decode('ascii')
+    return generate_password_hash(password, method=method)
+
+
+@lru_cache(maxsize=8)
+def _dummy_hash(method):
+    return hash_password('not-a-real-password', method)
+
+
+def verify_password(stored, password, method=None):
+    """Check `password` against `stored`. Pass stored=None for an unknown user
+    to spend the same time as a real check."""
+    if stored is None:
+        verify_password(_dummy_hash(_method(method)), password)
+        return False
+    if stored.startswith(BCRYPT_PREFIXES):
+        if bcrypt is None:
+            return False
+        return bcrypt.checkpw(password.encode('utf-8'), stored.encode('ascii'))
+    if stored.startswith(WERKZEUG_PREFIXES):
+        return check_password_hash(stored, password)
+    # Legacy plaintext row
+    return hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+
+
+def needs_rehash(stored, method=None):
+    method = _method(method)
+    if method.startswith('bcrypt'):
+        if not stored.startswith(BCRYPT_PREFIXES):
+            return True
+        cost = int(method.partition(':')[2] or 12)
+        return int(stored.split('$')[2]) != cost
+    return stored.split('$', 1)[0] != method
+
+
+def check_secret_key(secret_key):
+    if not secret_key or secret_key in INSECURE_SECRET_KEYS:
+        raise RuntimeError("SECRET_KEY must be set to a private random value; it signs the login tokens "
+                           "(python -c \"import secrets; print(secrets.token_hex(32))\")")
+
+
+@lru_cache(maxsize=4)
+def _serializer(secret_key):
+    # Neither issue nor accept tokens under a missing or public key
+    check_secret_key(secret_key)
+    return URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT)
+
+
+def issue_token(user):
+    payload = {'uid': user.id, 'role': user.role, 'inst': user.institution_id}
+    return _serializer(current_app.config['SECRET_KEY']).dumps(payload)
+
+
+def decode_token(token):
+    try:
+        return _serializer(current_app.config['SECRET_KEY']).loads(
+            token, max_age=current_app.config['AUTH_TOKEN_MAX_AGE']
+        )
+    except (BadSignature, SignatureExpired):
+        return None
+
+
+def require_auth(*roles):
+    """Reject requests without a valid bearer token (and, if given, one of `roles`).
+    The decoded claims are available as g.current_user."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            auth_header = request.headers.get('Authorization')
+            if not auth_header:
+                return jsonify({"message": "Missing authorization header"}), 401
+            scheme, _, token = auth_header.partition(' ')
+            claims = decode_token(token) if scheme.lower() == 'bearer' else None
+            if claims is None:
+                return jsonify({"message": "Invalid or expired token"}), 401
+            if roles and claims.get('role') not in roles:
+                return jsonify({"message": "Insufficient permissions"}), 403
+            g.current_user = claims
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
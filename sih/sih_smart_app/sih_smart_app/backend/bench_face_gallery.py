@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Memory of the face gallery across worker processes.
+
+Writes a synthetic gallery file, then starts N processes that each either
+map it with face_gallery.map_gallery() or read a private copy into memory
+(what loading the gallery per worker costs), touch every page with a
+similarity query and report their private and shared memory from
+/proc/<pid>/smaps_rollup (Linux only). Also times the per-request version
+check and a remap after a new version is published.
+
+    python bench_face_gallery.py --students 20000 --photos 3 --dim 4096 --workers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from face_gallery import SharedGallery, map_gallery, write_gallery
+
+
+def memory_kb():
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0), fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+
+
+def worker(path, mode, ready, done, results):
+    before, _ = memory_kb()
+    gallery = map_gallery(path)
+    matrix = gallery.matrix if mode == 'mmap' else np.array(gallery.matrix)
+    probe = np.ones(matrix.shape[1], dtype=np.float32)
+    (matrix @ probe).argmax()
+    ready.wait()
+    private, shared = memory_kb()
+    results.put((mode, private - before, shared))
+    done.wait()
+
+
+def run(path, mode, workers):
+    ready, done = multiprocessing.Barrier(workers + 1), multiprocessing.Event()
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(path, mode, ready, done, results)) for _ in range(workers)]
+    for p in processes:
+        p.start()
+    ready.wait()
+    rows = [results.get() for _ in processes]
+    done.set()
+    for p in processes:
+        p.join()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--photos', type=int, default=3)
+    parser.add_argument('--dim', type=int, default=4096, help="4096 for VGG-Face, 512 for Facenet512/ArcFace")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    rows = args.students * args.photos
+    rng = np.random.default_rng(0)
+    user_ids = np.repeat(np.arange(1, args.students + 1), args.photos)
+    matrix = rng.standard_normal((rows, args.dim), dtype=np.float32)
+    path = os.path.join(directory, 'bench.v1.gallery')
+    write_gallery(path, 1, user_ids, matrix)
+    del matrix
+    size_mb = os.path.getsize(path) / 2 ** 20
+    print(f"Gallery: {rows} x {args.dim} float32 = {size_mb:.0f} MB, {args.workers} workers")
+
+    for mode in ('copy', 'mmap'):
+        results = run(path, mode, args.workers)
+        private = sum(r[1] for r in results) / 1024
+        print(f"  {mode:<5} private {private:8.0f} MB total ({private / args.workers:.0f} MB/worker), "
+              f"shared {results[0][2] / 1024:.0f} MB/worker")
+
+    gallery = SharedGallery(directory, 'bench')
+    with open(gallery.pointer, 'w') as f:
+        f.write('bench.v1.gallery')
+    gallery.get()
+    start = time.perf_counter()
+    for _ in range(10000):
+        gallery.get()
+    print(f"  version check: {(time.perf_counter() - start) / 10000 * 1e6:.1f} us per get()")
+    write_gallery(os.path.join(directory, 'bench.v2.gallery'), 2, user_ids, np.zeros((rows, args.dim), dtype=np.float32))
+    with open(gallery.pointer + '.tmp', 'w') as f:
+        f.write('bench.v2.gallery')
+    os.replace(gallery.pointer + '.tmp', gallery.pointer)
+    start = time.perf_counter()
+    version = gallery.get().version
+    print(f"  remap to version {version}: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
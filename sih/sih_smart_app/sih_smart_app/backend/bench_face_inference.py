@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Parity and throughput of an exported embedding model against DeepFace.
+
+Detects the faces in a photo directory (known_faces/ by default), embeds
+them with the reference Keras model and with the exported model (see
+`flask export-face-model`) at each thread count, and prints load time,
+faces per second and how far the exported embeddings are from the
+reference: cosine distance per face and whether every face keeps the same
+nearest neighbour. Exits with status 1 when the largest distance exceeds
+--max-distance, so it can gate a deployment of FACE_INFERENCE_BACKEND.
+
+    python bench_face_inference.py --model instance/vgg-int8.tflite --threads 1 2 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from deepface import DeepFace
+
+from config import Config
+from face_enrollment import IMAGE_EXTENSIONS
+from face_inference import DeepFaceBackend, create_backend
+
+
+def face_crops(directory, detector, limit):
+    crops = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS) and len(crops) < limit:
+                faces = DeepFace.extract_faces(img_path=os.path.join(root, name), detector_backend=detector,
+                                               enforce_detection=False, align=True)
+                crops.extend(face['face'] for face in faces if face.get('confidence'))
+    return crops[:limit]
+
+
+def timed(backend, crops, repeat):
+    backend.embed(crops[:1])
+    start = time.perf_counter()
+    for _ in range(repeat):
+        vectors = np.vstack(backend.embed(crops))
+    return len(crops) * repeat / (time.perf_counter() - start), vectors
+
+
+def nearest_neighbours(vectors):
+    scores = vectors @ vectors.T
+    np.fill_diagonal(scores, -np.inf)
+    return scores.argmax(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', required=True, help="Exported .tflite or .onnx file")
+    parser.add_argument('--backend', choices=['tflite', 'onnx'], default=None, help="Default: from the file extension")
+    parser.add_argument('--model-name', default=Config.FACE_MODEL_NAME)
+    parser.add_argument('--photos', default='known_faces')
+    parser.add_argument('--detector', default=Config.FACE_DETECTOR)
+    parser.add_argument('--faces', type=int, default=64, help="Use at most this many faces")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, os.cpu_count()])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-distance', type=float, default=0.02,
+                        help="Largest cosine distance to the reference embedding that passes")
+    args = parser.parse_args()
+    backend = args.backend or ('onnx' if args.model.endswith('.onnx') else 'tflite')
+
+    crops = face_crops(args.photos, args.detector, args.faces)
+    if not crops:
+        sys.exit(f"No faces found under {args.photos}")
+    print(f"{len(crops)} faces from {args.photos}, {args.model_name}")
+
+    start = time.perf_counter()
+    reference = DeepFaceBackend(args.model_name)
+    reference.embed(crops[:1])
+    load = time.perf_counter() - start
+    rate, expected = timed(reference, crops, args.repeat)
+    print(f"  {'deepface':<10}{'':>8}  load {load:6.1f} s  {rate:8.1f} faces/s")
+    neighbours = nearest_neighbours(expected) if len(crops) > 2 else None
+
+    worst = 0.0
+    for threads in args.threads:
+        start = time.perf_counter()
+        candidate = create_backend(backend, args.model_name, args.model, threads)
+        load = time.perf_counter() - start
+        rate, vectors = timed(candidate, crops, args.repeat)
+        distances = 1.0 - (vectors * expected).sum(axis=1)
+        worst = max(worst, float(distances.max()))
+        agree = f"  same nearest neighbour {np.mean(nearest_neighbours(vectors) == neighbours):.0%}" if neighbours is not None else ""
+        print(f"  {backend:<10}{f'{threads} thr':>8}  load {load:6.1f} s  {rate:8.1f} faces/s  "
+              f"distance mean {distances.mean():.4f} max {distances.max():.4f}{agree}")
+
+    if worst > args.max_distance:
+        print(f"FAIL: largest distance {worst:.4f} exceeds {args.max_distance}")
+        sys.exit(1)
+    print(f"OK: largest distance {worst:.4f} within {args.max_distance}")
+
+
+if __name__ == '__main__':
+    main()
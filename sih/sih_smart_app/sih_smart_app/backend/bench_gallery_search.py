@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Full-precision vs compact face gallery search.
+
+Builds a synthetic gallery (a random unit "identity" per student, several
+noisy photos each), writes it in every gallery mode and runs the same probe
+faces through face_gallery.search(): probes of enrolled students and of
+strangers who should match nobody. Reports file size, the bytes the first
+pass has to read per query, median latency per probe, and accuracy: top-1
+agreement with the exact float32 scan and the share of probes resolved to
+the right student (or to nobody, for strangers).
+
+    python bench_gallery_search.py --students 20000 --photos 3 --dim 4096
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from face_gallery import MODES, map_gallery, search, write_gallery
+
+
+def normalize(x):
+    return (x / np.linalg.norm(x, axis=-1, keepdims=True)).astype(np.float32)
+
+
+def synthetic(students, photos, dim, noise, rng):
+    identities = normalize(rng.standard_normal((students, dim), dtype=np.float32))
+    user_ids = np.repeat(np.arange(1, students + 1), photos)
+    jitter = rng.standard_normal((students * photos, dim), dtype=np.float32) * (noise / np.sqrt(dim))
+    return identities, user_ids, normalize(identities[user_ids - 1] + jitter)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--photos', type=int, default=3)
+    parser.add_argument('--dim', type=int, default=4096, help="4096 for VGG-Face, 512 for Facenet512/ArcFace")
+    parser.add_argument('--noise', type=float, default=0.8, help="Photo-to-photo variation of one identity")
+    parser.add_argument('--probes', type=int, default=200)
+    parser.add_argument('--threshold', type=float, default=0.68, help="Cosine distance (FACE_MATCH_THRESHOLD)")
+    parser.add_argument('--candidates', type=int, default=20, help="FACE_GALLERY_CANDIDATES")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    identities, user_ids, matrix = synthetic(args.students, args.photos, args.dim, args.noise, rng)
+    known = rng.choice(args.students, size=args.probes // 2, replace=False)
+    strangers = normalize(rng.standard_normal((args.probes - len(known), args.dim), dtype=np.float32))
+    jitter = rng.standard_normal((len(known), args.dim), dtype=np.float32) * (args.noise / np.sqrt(args.dim))
+    probes = list(normalize(identities[known] + jitter)) + list(strangers)
+    expected = [int(i) + 1 for i in known] + [None] * len(strangers)
+
+    directory = tempfile.mkdtemp()
+    print(f"{args.students} students x {args.photos} photos, dim {args.dim}, {len(probes)} probes "
+          f"({len(known)} enrolled), top {args.candidates} re-ranked")
+    print(f"{'mode':<9}{'file MB':>9}{'scan MB/query':>15}{'ms/probe':>10}{'= exact':>9}{'correct':>9}")
+    exact = None
+    for mode in MODES:
+        path = os.path.join(directory, f"bench.{mode}.gallery")
+        write_gallery(path, 1, user_ids, matrix, mode)
+        gallery = map_gallery(path)
+        scanned = gallery.matrix.nbytes if gallery.centroids is None else gallery.centroids.nbytes + gallery.scales.nbytes
+        results, samples = [], []
+        for probe in probes:
+            start = time.perf_counter()
+            found = search(gallery, [probe], args.threshold, args.candidates)
+            samples.append((time.perf_counter() - start) * 1000)
+            results.append(next(iter(found), None))
+        exact = exact or results
+        agree = sum(a == b for a, b in zip(results, exact)) / len(probes)
+        correct = sum(a == b for a, b in zip(results, expected)) / len(probes)
+        print(f"{mode:<9}{os.path.getsize(path) / 2 ** 20:>9.0f}{scanned / 2 ** 20:>15.1f}"
+              f"{np.median(samples):>10.2f}{agree:>9.1%}{correct:>9.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark password hash settings against login-burst capacity.
+
+For each candidate PASSWORD_HASH_METHOD this measures the cost of one verify
+(the work done per login) and estimates how long a burst of logins takes to
+drain with the given number of worker processes, e.g. every student logging
+in during the first morning of term.
+
+    python bench_password_hash.py --burst 5000 --workers 4
+    python bench_password_hash.py --methods bcrypt:10 bcrypt:12 pbkdf2:sha256:600000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from auth import bcrypt, hash_password, verify_password
+
+DEFAULT_METHODS = ['pbkdf2:sha256:100000', 'pbkdf2:sha256:600000', 'scrypt:32768:8:1']
+if bcrypt is not None:
+    DEFAULT_METHODS += ['bcrypt:10', 'bcrypt:12']
+
+
+def time_verify(method, rounds):
+    stored = hash_password('Correct#Horse1', method)
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        verify_password(stored, 'Correct#Horse1', method)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS)
+    parser.add_argument('--rounds', type=int, default=5, help="verifications timed per method")
+    parser.add_argument('--burst', type=int, default=5000, help="logins arriving at once")
+    parser.add_argument('--workers', type=int, default=4, help="gunicorn worker processes")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    with app.app_context():
+        print(f"{'method':<24} {'verify ms':>10} {'logins/s':>10} {'burst drain s':>14}")
+        for method in args.methods:
+            ms = time_verify(method, args.rounds)
+            per_second = args.workers * 1000 / ms
+            print(f"{method:<24} {ms:>10.1f} {per_second:>10.0f} {args.burst / per_second:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-request overhead of the rate limiter storage backends.
+
+Measures the latency of one limiter hit against the in-process memory storage
+and the shared SQLite storage, then runs several processes against the same
+SQLite file to check that they enforce a single global limit.
+
+    python bench_rate_limit.py --hits 20000 --workers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+
+import rate_limit_storage  # noqa: F401 - registers the sqlite:// limiter storage
+
+STRATEGIES = {
+    'fixed-window': FixedWindowRateLimiter,
+    'sliding-window-counter': SlidingWindowCounterRateLimiter,
+}
+
+
+def time_hits(storage_uri, strategy, hits, keys=100):
+    limiter = STRATEGIES[strategy](storage_from_string(storage_uri))
+    item = parse("1000000 per hour")
+    samples = []
+    for i in range(hits):
+        key = f"10.0.0.{i % keys}"
+        start = time.perf_counter()
+        limiter.hit(item, key)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p99": samples[int(len(samples) * 0.99)],
+    }
+
+
+def _worker(storage_uri, strategy, attempts, results):
+    limiter = STRATEGIES[strategy](storage_from_string(storage_uri))
+    item = parse("100 per minute")
+    results.put(sum(1 for _ in range(attempts) if limiter.hit(item, "shared-client")))
+
+
+def shared_limit_check(storage_uri, strategy, workers, attempts=100):
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_worker, args=(storage_uri, strategy, attempts, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    return sum(results.get() for _ in procs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hits', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'storage':<10} {'strategy':<24} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}")
+        for strategy in STRATEGIES:
+            for name, uri in [('memory', 'memory://'), ('sqlite', f"sqlite:///{tmp}/{strategy}.db")]:
+                r = time_hits(uri, strategy, args.hits)
+                print(f"{name:<10} {strategy:<24} {r['mean']:>9.1f} {r['p50']:>9.1f} {r['p99']:>9.1f}")
+
+        print(f"\nShared limit of 100/minute across {args.workers} processes:")
+        for strategy in STRATEGIES:
+            allowed = shared_limit_check(f"sqlite:///{tmp}/shared-{strategy}.db", strategy, args.workers)
+            print(f"  {strategy:<24} allowed {allowed} hits")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for response serialization.
+
+Builds an attendance-history payload the way the endpoint used to (dicts
+built field by field with strftime, Flask's stdlib JSON provider) and with
+the declared schemas plus FastJSONProvider, then compares gzip and brotli
+on the result. Rows are plain objects, so only serialization is measured.
+
+    python bench_serialization.py --rows 2000 --repeat 50
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, time as dtime, timedelta
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import fast_json
+import serializers
+
+
+def make_records(n, seed=42):
+    rng = random.Random(seed)
+    subjects = [SimpleNamespace(name=f"Subject {i}", course_code=f"CS{i:03d}") for i in range(8)]
+    classes = [SimpleNamespace(subject=rng.choice(subjects), start_time=dtime(h, 0), end_time=dtime(h + 1, 0))
+               for h in range(9, 17)]
+    start = date(2025, 1, 6)
+    return [SimpleNamespace(date=start + timedelta(days=i // 6), class_schedule=rng.choice(classes),
+                            status=rng.choice(["present", "present", "present", "absent"]))
+            for i in range(n)]
+
+
+def old_path(records):
+    attendance_history = []
+    for record in records:
+        attendance_history.append({
+            "date": record.date.strftime('%Y-%m-%d'),
+            "subject": f"{record.class_schedule.subject.name} ({record.class_schedule.subject.course_code})",
+            "status": record.status,
+            "class_time": f"{record.class_schedule.start_time.strftime('%H:%M')} - {record.class_schedule.end_time.strftime('%H:%M')}"
+        })
+    return attendance_history
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    records = make_records(args.rows)
+    app = Flask(__name__)
+    stdlib = DefaultJSONProvider(app)
+    fast = fast_json.FastJSONProvider(app)
+
+    with app.app_context():
+        build_old, payload = timed(lambda: old_path(records), args.repeat)
+        build_new, _ = timed(lambda: serializers.ATTENDANCE_HISTORY.dump_many(records), args.repeat)
+        dump_old, _ = timed(lambda: stdlib.response(payload).get_data(), args.repeat)
+        dump_new, body = timed(lambda: fast.response(payload).get_data(), args.repeat)
+
+    print(f"{args.rows} attendance history rows (median of {args.repeat}, orjson {'on' if fast_json.orjson else 'off'})")
+    print(f"{'':<24}{'build ms':>10}{'encode ms':>11}{'total ms':>10}")
+    print(f"{'hand-built + stdlib':<24}{build_old:>10.2f}{dump_old:>11.2f}{build_old + dump_old:>10.2f}")
+    print(f"{'schema + FastJSON':<24}{build_new:>10.2f}{dump_new:>11.2f}{build_new + dump_new:>10.2f}")
+
+    print(f"\nBody: {len(body)} bytes")
+    encodings = ['gzip'] + (['br'] if fast_json.brotli else [])
+    for encoding in encodings:
+        elapsed, compressed = timed(lambda: fast_json.compress_body(body, encoding), args.repeat)
+        print(f"  {encoding:<5} {len(compressed):>8} bytes ({len(compressed) / len(body):.0%}) in {elapsed:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
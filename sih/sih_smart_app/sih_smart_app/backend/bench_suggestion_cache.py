@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Lookup latency of the AI suggestion cache.
+
+Prints the median time of a hit served from the in-process LRU, a hit read
+from the SQLite file and a miss. The SQLite hits come from a second cache
+on the same file that keeps a single entry in memory and alternates
+between two keys, so every lookup goes to the file. Correctness of hits,
+misses and invalidation is covered by tests/test_suggestion_cache.py.
+
+    python bench_suggestion_cache.py --repeat 1000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from suggestion_cache import SuggestionCache, suggestion_key
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    today = date.today()
+    attendance = {"overall_percentage": 82.0, "subject_stats": {}}
+    keys = [suggestion_key(SimpleNamespace(id=user_id, career_goal="Data Scientist", weak_subjects="Databases",
+                                           interests="AI"), today, attendance) for user_id in (1, 2)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'suggestions.db')
+        cache = SuggestionCache(path)
+        for key in keys:
+            cache.set(key, "1. Review notes from your weakest subject.")
+        reader = SuggestionCache(path, max_entries=1)
+
+        memory = median_ms(lambda: cache.get(keys[0]), args.repeat)
+        lookups = iter(range(args.repeat))
+        sqlite = median_ms(lambda: reader.get(keys[next(lookups) % 2]), args.repeat)
+        misses = iter(range(args.repeat))
+        miss = median_ms(lambda: cache.get(f"missing:{next(misses)}"), args.repeat)
+        print(f"median ms: memory hit {memory:.4f}, SQLite hit {sqlite:.3f}, miss {miss:.3f}")
+
+
+if __name__ == '__main__':
+    main()
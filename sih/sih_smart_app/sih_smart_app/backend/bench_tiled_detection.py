@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Whole-photo vs tiled face detection on a lecture-hall photo.
+
+Runs the configured fast detector (FACE_DETECTOR) over the photo at full
+resolution, over a copy downscaled to the tile size, and tiled with
+increasing pool sizes. Prints faces found and the median wall time of each,
+so recall and speed-up can be read side by side. The first tiled run warms
+up the pool (process start and model load) and is not timed.
+
+    python bench_tiled_detection.py --photo uploads/hall.jpg --workers 1 2 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import cv2
+
+from config import Config
+import face_detection
+from face_enrollment import load_image
+
+
+def timed(fn, repeat):
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--photo', required=True)
+    parser.add_argument('--detector', default=Config.FACE_DETECTOR)
+    parser.add_argument('--tile-size', type=int, default=Config.FACE_TILE_SIZE or 1280)
+    parser.add_argument('--overlap', type=int, default=Config.FACE_TILE_OVERLAP)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, os.cpu_count()])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    try:
+        face_detection.check_tiling(args.tile_size, args.overlap)
+    except ValueError as e:
+        parser.error(str(e))
+
+    image = load_image(args.photo)
+    if image is None:
+        sys.exit(f"Cannot read {args.photo}")
+    height, width = image.shape[:2]
+    tiles = face_detection.tile_boxes(height, width, args.tile_size, args.overlap)
+    print(f"{args.photo}: {width}x{height}, detector {args.detector}, "
+          f"{len(tiles)} tiles of {args.tile_size}px with {args.overlap}px overlap")
+
+    scale = args.tile_size / max(height, width)
+    small = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    ms, faces = timed(lambda: face_detection.extract(small, args.detector), args.repeat)
+    print(f"  {'downscaled':<16}{len(faces):>6} faces {ms:>10.0f} ms")
+    full_ms, faces = timed(lambda: face_detection.extract(image, args.detector), args.repeat)
+    print(f"  {'full resolution':<16}{len(faces):>6} faces {full_ms:>10.0f} ms")
+
+    for workers in args.workers:
+        face_detection._pool.update(pid=None, executor=None)
+        config = {'FACE_TILE_SIZE': args.tile_size, 'FACE_TILE_OVERLAP': args.overlap, 'FACE_TILE_WORKERS': workers}
+        face_detection.detect_tiled(image, args.detector, config)
+        ms, faces = timed(lambda: face_detection.detect_tiled(image, args.detector, config), args.repeat)
+        print(f"  {f'tiled x{workers}':<16}{len(faces):>6} faces {ms:>10.0f} ms  ({full_ms / ms:.1f}x)")
+        face_detection._pool['executor'].shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Attendance writes per second on SQLite, with and without the write queue.
+
+Runs --threads request threads, each saving --saves batches of attendance
+marks for its own class against a fresh SQLite file, the way
+save_attendance does: plan_save() reads the class's records, then
+save_planned() writes the rows and the at-risk counters. First every
+thread commits its own transaction, as save_attendance does by default,
+then the writes go through WriteQueue (see write_queue.py), which writes
+all the saves of a round with one insert, one update and one counter
+update. Prints saves per second, latency percentiles, failed saves
+("database is locked" and the like) and, for the queue, how many saves
+each transaction carried.
+
+    python bench_write_queue.py --threads 16 --saves 20 --students 30
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from sqlalchemy import insert
+
+from attendance_sync import plan_save, save_planned
+from models import User, db
+from write_queue import WriteQueue, batched
+
+
+def make_app(path, students=0):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        if students:
+            # The counters look up each student's institution, branch and semester
+            db.session.execute(insert(User.__table__), [
+                {"id": user_id, "college_id": f"S{user_id}", "password": "-", "name": f"Student {user_id}",
+                 "role": "student", "institution_id": 1} for user_id in range(students)])
+            db.session.commit()
+    return app
+
+
+@batched
+def write_saves(calls):
+    save_planned([plan for (plan,) in calls])
+    return [None] * len(calls)
+
+
+def run(app, write_queue, threads, saves, students):
+    latencies, errors = [], Counter()
+    lock = threading.Lock()
+
+    def worker(class_id):
+        roster = range(class_id * students, (class_id + 1) * students)
+        for i in range(saves):
+            marks = {student_id: (student_id + i) % 3 != 0 for student_id in roster}
+            start = time.perf_counter()
+            try:
+                with app.app_context():
+                    try:
+                        plan = plan_save(class_id, class_id, marks, date.today())
+                        if write_queue is not None:
+                            db.session.commit()
+                            write_queue.run(write_saves, plan, timeout=60)
+                        else:
+                            save_planned([plan])
+                            db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+                        raise
+            except Exception as e:
+                with lock:
+                    # The driver's error, not SQLAlchemy's wrapper around it
+                    errors[str(getattr(e, 'orig', e))[:70]] += 1
+                continue
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    workers = [threading.Thread(target=worker, args=(class_id,)) for class_id in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies), errors
+
+
+class CountingQueue(WriteQueue):
+    """WriteQueue recording the size of each committed batch."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    def _commit(self, batch):
+        self.batches.append(len(batch))
+        super()._commit(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--saves', type=int, default=20, help="Saves per thread")
+    parser.add_argument('--students', type=int, default=30, help="Marks per save")
+    parser.add_argument('--max-batch', type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.saves} saves of {args.students} marks")
+    print(f"{'':<14}{'saves/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'failed':>8}")
+    for mode in ('direct', 'write queue'):
+        with tempfile.TemporaryDirectory() as directory:
+            app = make_app(os.path.join(directory, 'bench.db'), args.threads * args.students)
+            write_queue = CountingQueue(app, args.max_batch) if mode == 'write queue' else None
+            elapsed, latencies, errors = run(app, write_queue, args.threads, args.saves, args.students)
+            with app.app_context():
+                db.engine.dispose()
+        p50 = latencies[len(latencies) // 2] if latencies else 0.0
+        p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+        print(f"{mode:<14}{len(latencies) / elapsed:>9.0f}{p50:>9.1f}{p99:>9.1f}{sum(errors.values()):>8}")
+        for message, count in errors.most_common(3):
+            print(f"    {count} x {message}")
+        if write_queue is not None and write_queue.batches:
+            print(f"    {len(write_queue.batches)} transactions, "
+                  f"{statistics.fmean(write_queue.batches):.1f} saves each (max {max(write_queue.batches)})")
+
+
+if __name__ == '__main__':
+    main()
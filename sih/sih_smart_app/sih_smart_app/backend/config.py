@@ -5,6 +5,132 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Config:
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'a-very-secret-key'
+    # Required: signs the bearer tokens (see auth.py); the app refuses to start without it.
+    # Generate one with: python -c "import secrets; print(secrets.token_hex(32))"
+    SECRET_KEY = os.environ.get('SECRET_KEY')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Rate limiting: counters live in a file shared by all workers (see rate_limit_storage.py)
+    RATELIMIT_STORAGE_URI = os.environ.get('RATE_LIMIT_STORAGE_URL') or 'sqlite:///instance/ratelimit.db'
+    # 'fixed-window' or 'sliding-window-counter'
+    RATELIMIT_STRATEGY = os.environ.get('RATE_LIMIT_STRATEGY') or 'fixed-window'
+    # Set RATE_LIMIT_ENABLED=0 for local load tests (load_test.py)
+    RATELIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') != '0'
+
+    # Authentication: 'bcrypt:<cost>' (needs bcrypt) or a full Werkzeug method such as
+    # 'pbkdf2:sha256:600000' / 'scrypt:32768:8:1'. Tune with bench_password_hash.py.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256:600000'
+    AUTH_TOKEN_MAX_AGE = int(os.environ.get('AUTH_TOKEN_MAX_AGE') or 12 * 3600)
+
+    # Cache for AI routine suggestions (see suggestion_cache.py)
+    SUGGESTION_CACHE_PATH = os.environ.get('SUGGESTION_CACHE_PATH') or 'instance/suggestions.db'
+    SUGGESTION_CACHE_TTL = int(os.environ.get('SUGGESTION_CACHE_TTL') or 24 * 3600)
+    SUGGESTION_CACHE_SIZE = int(os.environ.get('SUGGESTION_CACHE_SIZE') or 10000)
+
+    # Gemini client (see ai_client.py): per-call deadline and circuit breaker
+    AI_MODEL_NAME = os.environ.get('AI_MODEL_NAME') or 'gemini-1.5-flash-latest'
+    AI_TIMEOUT = float(os.environ.get('AI_TIMEOUT') or 8.0)
+    AI_BREAKER_THRESHOLD = int(os.environ.get('AI_BREAKER_THRESHOLD') or 3)
+    AI_BREAKER_COOLDOWN = float(os.environ.get('AI_BREAKER_COOLDOWN') or 60.0)
+
+    # JSON responses at least this large are gzip/brotli compressed (see fast_json.py)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 1024)
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL') or 6)
+
+    # Attendance change feed (see events.py): empty for in-process, or
+    # 'sqlite:///instance/events.db' to share events between workers
+    EVENT_BROKER_URL = os.environ.get('EVENT_BROKER_URL') or ''
+    EVENT_STREAM_TIMEOUT = float(os.environ.get('EVENT_STREAM_TIMEOUT') or 300.0)
+
+    # Group commit for SQLite (see write_queue.py): save_attendance and face enrollment hand their writes
+    # to one writer thread per process, which commits everything queued in a single transaction.
+    # bench_write_queue.py measured about 2x the saves/s under concurrent saves and p99 down from
+    # about 1.4 s to under 0.1 s, for a slower median save (about 10 ms -> 60-75 ms), so it pays
+    # off when many classes save at once. A write still queued after
+    # WRITE_QUEUE_TIMEOUT seconds is cancelled and the request gets a 503
+    WRITE_QUEUE_ENABLED = os.environ.get('WRITE_QUEUE_ENABLED', '0') != '0'
+    WRITE_QUEUE_MAX_BATCH = int(os.environ.get('WRITE_QUEUE_MAX_BATCH') or 64)
+    WRITE_QUEUE_TIMEOUT = float(os.environ.get('WRITE_QUEUE_TIMEOUT') or 30.0)
+
+    # Largest batch accepted by /api/sync/attendance (see attendance_sync.py)
+    SYNC_MAX_ITEMS = int(os.environ.get('SYNC_MAX_ITEMS') or 200)
+
+    # Columnar snapshots for reporting, written by `flask export-analytics` (see analytics_export.py)
+    ANALYTICS_DIR = os.environ.get('ANALYTICS_DIR') or 'instance/analytics'
+    ANALYTICS_KEEP = int(os.environ.get('ANALYTICS_KEEP') or 3)
+
+    # Recognition profiling (see profiling.py): histograms shared by all workers through METRICS_PATH
+    # are served on /metrics, and ?profile=1 captures are written to PROFILE_DIR and served on
+    # /metrics/profiles/<name>. Both answer only "Authorization: Bearer $METRICS_TOKEN" (404 while
+    # it is unset; the client address is the proxy's behind nginx). ?profile=1 is honoured only
+    # when PROFILING_ENABLED is set
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_PATH = os.environ.get('METRICS_PATH') or 'instance/metrics.db'
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL') or 5.0)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') != '0'
+    PROFILING_INTERVAL = float(os.environ.get('PROFILING_INTERVAL') or 0.005)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or 'instance/profiles'
+    PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP') or 20)
+
+    # Face recognition (see face_enrollment.py). Defaults match the DeepFace setup the
+    # known_faces/ gallery was built with: VGG-Face embeddings, OpenCV detector, cosine distance
+    FACE_MODEL_NAME = os.environ.get('FACE_MODEL_NAME') or 'VGG-Face'
+    FACE_DETECTOR = os.environ.get('FACE_DETECTOR') or 'opencv'
+    FACE_MATCH_THRESHOLD = float(os.environ.get('FACE_MATCH_THRESHOLD') or 0.68)
+    # Enrollment photos are rejected below these: face width in pixels, Laplacian variance
+    FACE_MIN_SIZE = int(os.environ.get('FACE_MIN_SIZE') or 80)
+    FACE_MIN_SHARPNESS = float(os.environ.get('FACE_MIN_SHARPNESS') or 50.0)
+    FACE_ENROLL_MAX_PHOTOS = int(os.environ.get('FACE_ENROLL_MAX_PHOTOS') or 10)
+    # Detection cascade for attendance photos (see face_detection.py): FACE_DETECTOR runs first and
+    # FACE_ACCURATE_DETECTOR (e.g. 'retinaface', 'mtcnn'; empty to disable) re-checks detections below
+    # FACE_CASCADE_MIN_CONFIDENCE or without both eyes (OpenCV's scores are not calibrated, so by
+    # default only the eye check applies). Smaller or blurrier faces are not embedded.
+    FACE_ACCURATE_DETECTOR = os.environ.get('FACE_ACCURATE_DETECTOR', 'retinaface')
+    FACE_CASCADE_MIN_CONFIDENCE = float(os.environ.get('FACE_CASCADE_MIN_CONFIDENCE') or 0.0)
+    FACE_RECOGNITION_MIN_SIZE = int(os.environ.get('FACE_RECOGNITION_MIN_SIZE') or 40)
+    FACE_RECOGNITION_MIN_SHARPNESS = float(os.environ.get('FACE_RECOGNITION_MIN_SHARPNESS') or 15.0)
+    # Opt-in: photos with a side longer than FACE_TILE_SIZE (0, the default, disables tiling;
+    # 1280 suits lecture-hall photos) are detected on overlapping full-resolution tiles in a
+    # process pool of FACE_TILE_WORKERS. Every pool process loads its own detector model, so
+    # the pool is small by default (0: one per CPU core). FACE_TILE_OVERLAP must be smaller
+    # than FACE_TILE_SIZE; the app refuses to start otherwise.
+    FACE_TILE_SIZE = int(os.environ.get('FACE_TILE_SIZE') or 0)
+    FACE_TILE_OVERLAP = int(os.environ.get('FACE_TILE_OVERLAP') or 200)
+    FACE_TILE_WORKERS = int(os.environ.get('FACE_TILE_WORKERS') or 2)
+    # Video attendance (see face_video.py): FACE_VIDEO_SAMPLE_FPS frames per second are detected and
+    # tracked by IoU, and each track of at least FACE_VIDEO_MIN_TRACK_HITS detections embeds its
+    # FACE_VIDEO_EMBEDDINGS_PER_TRACK best crops. Clips are cut at FACE_VIDEO_MAX_SECONDS
+    FACE_VIDEO_SAMPLE_FPS = float(os.environ.get('FACE_VIDEO_SAMPLE_FPS') or 5.0)
+    FACE_VIDEO_MAX_SECONDS = float(os.environ.get('FACE_VIDEO_MAX_SECONDS') or 30.0)
+    FACE_VIDEO_TRACK_IOU = float(os.environ.get('FACE_VIDEO_TRACK_IOU') or 0.3)
+    FACE_VIDEO_TRACK_MAX_AGE = int(os.environ.get('FACE_VIDEO_TRACK_MAX_AGE') or 3)
+    FACE_VIDEO_MIN_TRACK_HITS = int(os.environ.get('FACE_VIDEO_MIN_TRACK_HITS') or 2)
+    FACE_VIDEO_EMBEDDINGS_PER_TRACK = int(os.environ.get('FACE_VIDEO_EMBEDDINGS_PER_TRACK') or 2)
+    # Embedding model runtime (see face_inference.py): 'deepface' (Keras), or 'tflite' / 'onnx' running
+    # a model exported by `flask export-face-model` to FACE_INFERENCE_MODEL_PATH (check it first with
+    # bench_face_inference.py). FACE_INFERENCE_THREADS caps intra-op threads per process (0: runtime default)
+    FACE_INFERENCE_BACKEND = os.environ.get('FACE_INFERENCE_BACKEND') or 'deepface'
+    FACE_INFERENCE_MODEL_PATH = os.environ.get('FACE_INFERENCE_MODEL_PATH') or ''
+    FACE_INFERENCE_THREADS = int(os.environ.get('FACE_INFERENCE_THREADS') or 0)
+    # Memory-mapped gallery files shared by all workers (see face_gallery.py)
+    FACE_GALLERY_DIR = os.environ.get('FACE_GALLERY_DIR') or 'instance/gallery'
+    # Enrollment changes are published by a background rebuild FACE_GALLERY_PUBLISH_DELAY seconds
+    # later, so a bulk enrollment costs one rebuild per delay instead of one per student; until
+    # then recognition matches the previous gallery. 0 rebuilds inline in the request
+    FACE_GALLERY_PUBLISH_DELAY = float(os.environ.get('FACE_GALLERY_PUBLISH_DELAY') or 1.0)
+    # 'float32' scans every embedding; 'float16'/'int8' shortlist students by quantized
+    # centroid and re-rank the top FACE_GALLERY_CANDIDATES at full precision. int8 is also the
+    # faster one with NumPy, which converts float16 slowly (bench_gallery_search.py)
+    FACE_GALLERY_MODE = os.environ.get('FACE_GALLERY_MODE') or 'float32'
+    FACE_GALLERY_CANDIDATES = int(os.environ.get('FACE_GALLERY_CANDIDATES') or 20)
+    # Multi-photo attendance sessions (see attendance_session.py): photos are recognised by
+    # FACE_SESSION_WORKERS background threads per process, and faces from different photos within
+    # FACE_SESSION_MERGE_THRESHOLD (cosine distance, tighter than matching) are the same person.
+    # Finalizing waits up to FACE_SESSION_WAIT seconds for photos still being processed. A photo
+    # still pending FACE_SESSION_PHOTO_TIMEOUT seconds after upload (its worker was restarted) fails
+    FACE_SESSION_WORKERS = int(os.environ.get('FACE_SESSION_WORKERS') or 2)
+    FACE_SESSION_MERGE_THRESHOLD = float(os.environ.get('FACE_SESSION_MERGE_THRESHOLD') or 0.4)
+    FACE_SESSION_MAX_PHOTOS = int(os.environ.get('FACE_SESSION_MAX_PHOTOS') or 20)
+    FACE_SESSION_WAIT = float(os.environ.get('FACE_SESSION_WAIT') or 60.0)
+    FACE_SESSION_PHOTO_TIMEOUT = float(os.environ.get('FACE_SESSION_PHOTO_TIMEOUT') or 300.0)
@@ -0,0 +1,219 @@
+# File: backend/events.py
+"""
+Attendance change feed for server-sent events.
+
+Write paths publish small events to topics such as 'class:12', 'teacher:7'
+or 'institution:1'; dashboards hold one SSE connection and receive them
+instead of polling. EventBus fans events out to subscribers inside one
+process and keeps a short history so a reconnecting client can resume from
+its Last-Event-ID. With several workers, SQLiteEventBroker stores events in
+a file shared by all of them and one poller thread per worker delivers new
+rows to that worker's subscribers.
+
+SSE connections are long-lived: run gunicorn with threads
+(`--worker-class gthread --threads N`) so they do not tie up whole workers.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+
+Event = namedtuple('Event', 'id topics type data')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topics TEXT NOT NULL,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_events_created_at ON events (created_at);
+"""
+
+# Rows older than the retention window are deleted every PURGE_INTERVAL publishes
+PURGE_INTERVAL = 500
+
+
+class Subscription:
+    def __init__(self, topics, maxsize):
+        self.topics = frozenset(topics)
+        self.queue = queue.Queue(maxsize)
+        # Set when the client fell too far behind; the stream then closes so it reconnects and replays
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    """In-process publish/subscribe with a replay history of `history` events."""
+
+    def __init__(self, history=1000, queue_size=256):
+        self.queue_size = queue_size
+        self._history = deque(maxlen=history)
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def publish(self, topics, event_type, data):
+        with self._lock:
+            event = Event(self._next_id, tuple(topics), event_type, data)
+            self._next_id += 1
+            self._history.append(event)
+        self._deliver(event)
+        return event.id
+
+    def _deliver(self, event):
+        with self._lock:
+            targets = set()
+            for topic in event.topics:
+                targets.update(self._subscribers.get(topic, ()))
+        for subscription in targets:
+            subscription.put(event)
+
+    def _replay(self, topics, last_event_id):
+        with self._lock:
+            return [e for e in self._history if e.id > last_event_id and topics.intersection(e.topics)]
+
+    def subscribe(self, topics, last_event_id=None):
+        subscription = Subscription(topics, self.queue_size)
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers.setdefault(topic, set()).add(subscription)
+        if last_event_id is not None:
+            for event in self._replay(subscription.topics, last_event_id):
+                subscription.put(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+
+class SQLiteEventBroker(EventBus):
+    """EventBus whose events go through a SQLite file shared by all workers."""
+
+    def __init__(self, path, retention=3600, poll_interval=0.25, queue_size=256):
+        super().__init__(history=0, queue_size=queue_size)
+        self.path = path
+        self.retention = retention
+        self.poll_interval = poll_interval
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._publishes = 0
+        self._poller = None
+        self._poller_pid = None
+
+    @property
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def publish(self, topics, event_type, data):
+        now = time.time()
+        cursor = self._conn.execute(
+            "INSERT INTO events (topics, type, data, created_at) VALUES (?, ?, ?, ?)",
+            (" ".join(topics), event_type, json.dumps(data), now)
+        )
+        self._publishes += 1
+        if self._publishes % PURGE_INTERVAL == 0:
+            self._conn.execute("DELETE FROM events WHERE created_at < ?", (now - self.retention,))
+        # Delivery, including to this worker's own subscribers, happens in the poller
+        return cursor.lastrowid
+
+    def _rows_after(self, last_id, limit=1000):
+        rows = self._conn.execute(
+            "SELECT id, topics, type, data FROM events WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)
+        ).fetchall()
+        return [Event(row[0], tuple(row[1].split()), row[2], json.loads(row[3])) for row in rows]
+
+    def _poll(self):
+        last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                idle = not self._subscribers
+            try:
+                if idle:
+                    # Nothing to deliver; skip ahead so a later subscriber does not get a flood
+                    last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+                    continue
+                events = self._rows_after(last_id)
+            except sqlite3.Error as e:
+                print("Event broker poll failed: " + str(e))
+                continue
+            for event in events:
+                self._deliver(event)
+                last_id = event.id
+
+    def _ensure_poller(self):
+        with self._lock:
+            # A forked worker does not inherit the parent's thread
+            if self._poller is None or self._poller_pid != os.getpid():
+                self._poller = threading.Thread(target=self._poll, name='event-broker', daemon=True)
+                self._poller_pid = os.getpid()
+                self._poller.start()
+
+    def _replay(self, topics, last_event_id):
+        return [e for e in self._rows_after(last_event_id) if topics.intersection(e.topics)]
+
+    def subscribe(self, topics, last_event_id=None):
+        self._ensure_poller()
+        return super().subscribe(topics, last_event_id)
+
+
+def event_bus_from_url(url):
+    """'' or 'memory://' -> EventBus, 'sqlite:///path' -> SQLiteEventBroker."""
+    if not url or url == 'memory://':
+        return EventBus()
+    if url.startswith('sqlite:///'):
+        return SQLiteEventBroker(url[len('sqlite:///'):])
+    raise ValueError(f"Unsupported EVENT_BROKER_URL {url!r}")
+
+
+def format_sse(event):
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data, separators=(',', ':'))}\n\n"
+
+
+def stream(bus, subscription, heartbeat=15.0, max_duration=300.0):
+    """Yield SSE frames for `subscription` until the client goes away, it
+    falls behind, or `max_duration` passes (clients reconnect and resume)."""
+    deadline = time.monotonic() + max_duration
+    try:
+        yield "retry: 3000\n\n"
+        last_sent = 0
+        while time.monotonic() < deadline and not subscription.overflowed:
+            event = subscription.get(timeout=min(heartbeat, max(0.0, deadline - time.monotonic())))
+            if event is None:
+                yield ": keep-alive\n\n"
+            elif event.id > last_sent:
+                # Replay and live delivery can overlap right after subscribing
+                last_sent = event.id
+                yield format_sse(event)
+    finally:
+        bus.unsubscribe(subscription)
@@ -0,0 +1,224 @@
+# File: backend/face_detection.py
+"""
+Detection cascade and quality gate for attendance photos.
+
+The cheap FACE_DETECTOR runs on every photo. Its detections are accepted
+when it is confident and found both eyes (which alignment needs); only the
+uncertain ones are re-checked by FACE_ACCURATE_DETECTOR on a crop around
+the region, and the accurate detector sees the whole photo only when the
+cheap pass found nothing. Faces smaller than FACE_RECOGNITION_MIN_SIZE or
+blurrier than FACE_RECOGNITION_MIN_SHARPNESS are dropped before embedding,
+and the rest are embedded in one batch. Every stage is timed.
+
+When FACE_TILE_SIZE is set (tiling is off by default), photos larger than
+it are detected tile by tile instead:
+overlapping tiles at full resolution, so back-row faces keep their pixels,
+run in parallel in a process pool and the boxes are merged with non-max
+suppression, which also removes the partial faces cut by a tile border.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+from deepface import DeepFace
+
+from face_enrollment import sharpness
+from face_inference import get_backend
+
+Face = namedtuple('Face', 'image area confidence detector')
+
+# Context added around an uncertain region before the accurate detector looks at it
+REGION_MARGIN = 0.5
+# Boxes overlapping more than this (IoU), or covering this much of the smaller box, are one face
+NMS_IOU = 0.3
+NMS_CONTAINMENT = 0.6
+
+
+class StageTimer:
+    """Wall time per named stage in milliseconds, accumulated over repeated stages."""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def report(self):
+        return {name: round(ms, 2) for name, ms in self.timings.items()}
+
+
+def extract(image, detector):
+    """Detected faces, without DeepFace's whole-image placeholder when there are none."""
+    faces = DeepFace.extract_faces(img_path=image, detector_backend=detector, enforce_detection=False, align=True)
+    height, width = image.shape[:2]
+    return [Face(f['face'], f['facial_area'], float(f.get('confidence') or 0), detector) for f in faces
+            if not (f.get('confidence', 0) == 0 and f['facial_area']['w'] >= width - 1 and f['facial_area']['h'] >= height - 1)]
+
+
+def check_tiling(size, overlap):
+    """Raise ValueError unless tiles of `size` sharing `overlap` pixels can cover a photo."""
+    if size and not 0 <= overlap < size:
+        raise ValueError(f"FACE_TILE_OVERLAP ({overlap}) must be at least 0 and smaller than "
+                         f"FACE_TILE_SIZE ({size})")
+
+
+def tile_boxes(height, width, size, overlap):
+    """(x0, y0, x1, y1) tiles of at most size x size covering the photo, neighbours
+    sharing `overlap` pixels so that a face up to that size is whole in some tile."""
+    check_tiling(size, overlap)
+
+    def starts(length):
+        if length <= size:
+            return [0]
+        step = size - overlap
+        positions = list(range(0, length - size, step))
+        return positions + [length - size]
+    return [(x, y, min(width, x + size), min(height, y + size)) for y in starts(height) for x in starts(width)]
+
+
+def _shift(face, dx, dy):
+    area = dict(face.area, x=face.area['x'] + dx, y=face.area['y'] + dy)
+    for eye in ('left_eye', 'right_eye'):
+        if area.get(eye) is not None:
+            area[eye] = (area[eye][0] + dx, area[eye][1] + dy)
+    return face._replace(area=area)
+
+
+def _detect_tile(tile, detector, offset):
+    # Runs in a pool process
+    return [_shift(face, *offset) for face in extract(tile, detector)]
+
+
+def non_max_suppression(faces):
+    """Keep the largest box of every group of overlapping boxes; a face cut by a
+    tile border is smaller than its whole copy from the neighbouring tile."""
+    kept = []
+    for face in sorted(faces, key=lambda f: f.area['w'] * f.area['h'], reverse=True):
+        a = face.area
+        for other in kept:
+            b = other.area
+            iw = min(a['x'] + a['w'], b['x'] + b['w']) - max(a['x'], b['x'])
+            ih = min(a['y'] + a['h'], b['y'] + b['h']) - max(a['y'], b['y'])
+            if iw <= 0 or ih <= 0:
+                continue
+            inter = iw * ih
+            area_a, area_b = a['w'] * a['h'], b['w'] * b['h']
+            if inter / (area_a + area_b - inter) > NMS_IOU or inter / min(area_a, area_b) > NMS_CONTAINMENT:
+                break
+        else:
+            kept.append(face)
+    return kept
+
+
+_pool = {'pid': None, 'executor': None}
+_pool_lock = threading.Lock()
+
+
+def _executor(workers):
+    with _pool_lock:
+        # One pool per process; a forked gunicorn worker must not reuse its parent's
+        if _pool['pid'] != os.getpid():
+            # spawn: forking a process that has TensorFlow loaded can deadlock the children
+            _pool['executor'] = ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                                    mp_context=multiprocessing.get_context('spawn'))
+            _pool['pid'] = os.getpid()
+        return _pool['executor']
+
+
+def detect_tiled(image, detector, config):
+    """Faces found on overlapping full-resolution tiles in parallel, merged with NMS."""
+    height, width = image.shape[:2]
+    boxes = tile_boxes(height, width, config['FACE_TILE_SIZE'], config['FACE_TILE_OVERLAP'])
+    executor = _executor(config['FACE_TILE_WORKERS'])
+    futures = [executor.submit(_detect_tile, np.ascontiguousarray(image[y0:y1, x0:x1]), detector, (x0, y0))
+               for x0, y0, x1, y1 in boxes]
+    return non_max_suppression([face for future in futures for face in future.result()])
+
+
+def _uncertain(face, min_confidence):
+    return (face.confidence < min_confidence or face.area.get('left_eye') is None
+            or face.area.get('right_eye') is None)
+
+
+def _refine(image, face, detector):
+    """Faces the accurate detector finds around an uncertain region, in photo coordinates."""
+    area = face.area
+    height, width = image.shape[:2]
+    mx, my = int(area['w'] * REGION_MARGIN), int(area['h'] * REGION_MARGIN)
+    x0, y0 = max(0, area['x'] - mx), max(0, area['y'] - my)
+    x1, y1 = min(width, area['x'] + area['w'] + mx), min(height, area['y'] + area['h'] + my)
+    return [_shift(found, x0, y0) for found in extract(np.ascontiguousarray(image[y0:y1, x0:x1]), detector)]
+
+
+def detect(image, config, timer):
+    """Cascade detection; returns (faces, stats)."""
+    fast, accurate = config['FACE_DETECTOR'], config['FACE_ACCURATE_DETECTOR']
+    tiled = bool(config['FACE_TILE_SIZE']) and max(image.shape[:2]) > config['FACE_TILE_SIZE']
+
+    def whole_photo(detector):
+        return detect_tiled(image, detector, config) if tiled else extract(image, detector)
+
+    with timer.stage('detect_fast'):
+        faces = whole_photo(fast)
+    stats = {"detected_fast": len(faces), "refined": 0, "full_photo_fallback": False, "tiled": tiled}
+    if not accurate or accurate == fast:
+        return faces, stats
+
+    with timer.stage('detect_accurate'):
+        if not faces:
+            stats["full_photo_fallback"] = True
+            return whole_photo(accurate), stats
+        kept = []
+        for face in faces:
+            if _uncertain(face, config['FACE_CASCADE_MIN_CONFIDENCE']):
+                stats["refined"] += 1
+                kept.extend(_refine(image, face, accurate))
+            else:
+                kept.append(face)
+        # Crops around neighbouring uncertain regions can find the same face twice
+        kept = non_max_suppression(kept)
+    return kept, stats
+
+
+def quality_gate(faces, min_size, min_sharpness):
+    """(usable faces, {"small": n, "blurred": n})"""
+    usable, rejected = [], {"small": 0, "blurred": 0}
+    for face in faces:
+        if min(face.area['w'], face.area['h']) < min_size:
+            rejected["small"] += 1
+        elif sharpness(face.image) < min_sharpness:
+            rejected["blurred"] += 1
+        else:
+            usable.append(face)
+    return usable, rejected
+
+
+def embed(faces, config):
+    """Normalised embeddings of aligned face crops, batched through the
+    configured inference backend (see face_inference.py)."""
+    if not faces:
+        return []
+    return get_backend(config).embed([face.image for face in faces])
+
+
+def recognize_faces(image, config, timer=None):
+    """Embeddings of the usable faces in an attendance photo and a report of
+    what each stage did and how long it took."""
+    timer = timer or StageTimer()
+    faces, stats = detect(image, config, timer)
+    with timer.stage('quality'):
+        usable, rejected = quality_gate(faces, config['FACE_RECOGNITION_MIN_SIZE'], config['FACE_RECOGNITION_MIN_SHARPNESS'])
+    with timer.stage('embed'):
+        embeddings = embed(usable, config)
+    report = dict(stats, faces=len(faces), rejected=rejected, embedded=len(embeddings))
+    return embeddings, report
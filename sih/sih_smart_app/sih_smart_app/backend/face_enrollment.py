@@ -0,0 +1,150 @@
+# File: backend/face_enrollment.py
+"""
+Face enrollment and the stored face embeddings.
+
+Enrollment detects and aligns the face in each photo once, checks that the
+photo is usable (exactly one face, wide enough, not blurred) and stores the
+embedding of the aligned crop as a FaceEmbedding row linked to User.id.
+Recognition then only embeds the faces in the attendance photo (see
+face_detection.py) and searches the stored vectors (see face_gallery.py); gallery
+images are never re-embedded per request. Model, detector and thresholds
+come from the FACE_* settings.
+"""
+import os
+
+import cv2
+import numpy as np
+from deepface import DeepFace
+from flask import current_app
+
+from face_inference import get_backend
+from models import db, FaceEmbedding, User
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+class FaceQualityError(ValueError):
+    """The photo cannot be enrolled; the message says why."""
+
+
+def load_image(source):
+    """BGR array from a path, raw bytes or an array (returned as is); None if unreadable."""
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, (bytes, bytearray)):
+        return cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return cv2.imread(source, cv2.IMREAD_COLOR)
+
+
+def sharpness(face):
+    """Variance of the Laplacian of a face crop (RGB, 0-1 floats); low means blurred."""
+    gray = cv2.cvtColor((face * 255).astype(np.uint8), cv2.COLOR_RGB2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def embed_enrollment_photo(image):
+    """(embedding, face_size, sharpness) for a photo holding exactly one usable face.
+    Raises FaceQualityError otherwise."""
+    config = current_app.config
+    if image is None:
+        raise FaceQualityError("Unreadable image")
+    try:
+        faces = DeepFace.extract_faces(img_path=image, detector_backend=config['FACE_DETECTOR'],
+                                       enforce_detection=True, align=True)
+    except ValueError:
+        raise FaceQualityError("No face detected")
+    if len(faces) != 1:
+        raise FaceQualityError(f"Expected one face, found {len(faces)}")
+    face, area = faces[0]['face'], faces[0]['facial_area']
+    face_size = int(min(area['w'], area['h']))
+    if face_size < config['FACE_MIN_SIZE']:
+        raise FaceQualityError(f"Face is {face_size}px wide; at least {config['FACE_MIN_SIZE']}px is needed")
+    score = sharpness(face)
+    if score < config['FACE_MIN_SHARPNESS']:
+        raise FaceQualityError(f"Image is too blurred (sharpness {score:.0f}, minimum {config['FACE_MIN_SHARPNESS']:.0f})")
+
+    # The crop is already aligned: embed it without running detection again
+    return get_backend(config).embed([face])[0], face_size, score
+
+
+def embed_photos(photos):
+    """Embed `photos` ((source name, path/bytes/array) pairs). Returns (results,
+    accepted): one result per photo, and (name, embedding, face_size, sharpness)
+    for the photos that passed the quality checks."""
+    results, accepted = [], []
+    for name, source in photos:
+        try:
+            vector, face_size, score = embed_enrollment_photo(load_image(source))
+        except FaceQualityError as e:
+            results.append({"photo": name, "status": "rejected", "message": str(e)})
+            continue
+        accepted.append((name, vector, face_size, round(score, 1)))
+        results.append({"photo": name, "status": "enrolled", "face_size": face_size, "sharpness": round(score, 1)})
+    return results, accepted
+
+
+def store_embeddings(user_id, accepted, replace=False):
+    """Add FaceEmbedding rows for `accepted` (see embed_photos); with `replace`,
+    they supersede the user's existing ones. Nothing changes when no photo was
+    accepted. The caller commits."""
+    if not accepted:
+        return
+    model_name = current_app.config['FACE_MODEL_NAME']
+    if replace:
+        FaceEmbedding.query.filter_by(user_id=user_id, model_name=model_name).delete()
+    db.session.add_all(FaceEmbedding(user_id=user_id, model_name=model_name, embedding=vector.tobytes(),
+                                     face_size=face_size, sharpness=score, source=name)
+                       for name, vector, face_size, score in accepted)
+
+
+def enroll(user, photos, replace=False):
+    """Embed and store `photos` for `user`; see embed_photos. Rejected photos
+    are not stored. The caller commits."""
+    results, accepted = embed_photos(photos)
+    store_embeddings(user.id, accepted, replace)
+    return results
+
+
+def photos_in_directory(directory):
+    """{key: [paths]} for a bulk-enroll directory: either one sub-directory per
+    student or files named after the student (an optional _N suffix allows several)."""
+    photos = {}
+    for entry in sorted(os.listdir(directory)):
+        path = os.path.join(directory, entry)
+        if os.path.isdir(path):
+            files = [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.lower().endswith(IMAGE_EXTENSIONS)]
+            if files:
+                photos.setdefault(entry, []).extend(files)
+        elif entry.lower().endswith(IMAGE_EXTENSIONS):
+            stem = os.path.splitext(entry)[0]
+            base, _, suffix = stem.rpartition('_')
+            key = base if base and suffix.isdigit() else stem
+            photos.setdefault(key, []).append(path)
+    return photos
+
+
+def find_student(key, institution_id=None):
+    """Student whose college ID, or failing that name, is `key`."""
+    query = User.query.filter_by(role='student')
+    if institution_id:
+        query = query.filter_by(institution_id=institution_id)
+    return query.filter_by(college_id=key).first() or query.filter_by(name=key).first()
+
+
+def load_gallery(model_name, user_ids=None):
+    """(user_ids, matrix) of the stored embeddings for `model_name`, one row per
+    enrolled photo, optionally limited to `user_ids`."""
+    query = db.session.query(FaceEmbedding.user_id, FaceEmbedding.embedding).filter(FaceEmbedding.model_name == model_name)
+    if user_ids is not None:
+        query = query.filter(FaceEmbedding.user_id.in_(user_ids))
+    rows = query.order_by(FaceEmbedding.user_id, FaceEmbedding.id).all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+    return (np.array([user_id for user_id, _ in rows], dtype=np.int64),
+            np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows]))
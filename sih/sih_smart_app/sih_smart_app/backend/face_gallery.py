@@ -0,0 +1,288 @@
+# File: backend/face_gallery.py
+"""
+Memory-mapped face gallery shared by all workers.
+
+The enrolled embeddings of one model are written to a single versioned file,
+`<model>.v<N>.gallery`: a 64-byte header (magic, version, rows, dimension),
+the user id of every row as int64 and the float32 matrix. `<model>.current`
+names the live version and is replaced atomically, so a reader sees either
+the old or the new gallery, never a partial one. Workers map the file
+read-only; the pages live once in the OS page cache however many workers
+there are, and matching reads them in place without copying.
+
+In the compact modes ('float16', 'int8') the file also carries one
+centroid per student, quantized, with the row range of that student's
+embeddings. search() scores the centroids first, which touches a fraction
+of the bytes of a full scan, then re-ranks the embeddings of the top
+FACE_GALLERY_CANDIDATES students at full precision; only those rows of the
+float32 matrix are paged in.
+
+Each get() costs one stat() of the pointer file; a worker remaps only when
+a publish has replaced it. publish() rebuilds the file from FaceEmbedding
+under a file lock, skipping the work if the file already carries the
+current version stamp. The version it replaces is kept for one more cycle,
+so a worker that read the old pointer can still open it. Enrollment
+requests call publish_soon(), which coalesces the changes of the next
+`delay` seconds into one background rebuild.
+"""
+import os
+import re
+import struct
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from face_enrollment import load_gallery
+from models import db, VersionStamp
+
+try:
+    import fcntl
+except ImportError:  # Windows: the dev server runs a single process
+    fcntl = None
+
+MAGIC = b'FACEGAL1'
+# magic, version, rows, dim, students (0 without centroids), mode
+HEADER = struct.Struct('<8sQQQQQ')
+HEADER_SIZE = 64
+MODES = ('float32', 'float16', 'int8')
+CENTROID_DTYPES = {'float16': np.float16, 'int8': np.int8}
+# Centroids are dequantized in blocks of about this many float32 bytes, small enough to stay in cache
+CENTROID_BLOCK_BYTES = 1 << 20
+
+Gallery = namedtuple('Gallery', 'version mode user_ids matrix centroid_ids offsets centroids scales')
+
+
+def version_key(model_name):
+    """VersionStamp key bumped whenever the gallery of `model_name` changes."""
+    return f"faces:{model_name}"
+
+
+def quantize(vectors, mode):
+    """(quantized, scales): float16 as is, int8 with one scale per row."""
+    if mode == 'float16':
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def student_centroids(user_ids, matrix):
+    """(ids, offsets, centroids) for rows grouped by user id: offsets[i]:offsets[i + 1]
+    are the rows of ids[i] and its centroid is their normalised mean."""
+    ids, starts = np.unique(user_ids, return_index=True)
+    offsets = np.append(starts, len(user_ids)).astype(np.int64)
+    sums = np.add.reduceat(matrix, starts, axis=0) if len(ids) else np.empty((0, matrix.shape[1]), dtype=np.float32)
+    norms = np.linalg.norm(sums, axis=1, keepdims=True)
+    return ids.astype(np.int64), offsets, (sums / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+
+def _sections(rows, dim, students, mode):
+    """[(name, dtype, shape)] in file order after the header."""
+    sections = [('user_ids', np.int64, (rows,)), ('matrix', np.float32, (rows, dim))]
+    if students:
+        sections += [('centroid_ids', np.int64, (students,)), ('offsets', np.int64, (students + 1,)),
+                     ('centroids', CENTROID_DTYPES[mode], (students, dim)), ('scales', np.float32, (students,))]
+    return sections
+
+
+def write_gallery(path, version, user_ids, matrix, mode='float32'):
+    """Write a gallery file (`matrix`: one row per user id, rows grouped by
+    user id for the compact modes) to a temporary name and rename it into place."""
+    user_ids = np.ascontiguousarray(user_ids, dtype=np.int64)
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    arrays = {'user_ids': user_ids, 'matrix': matrix}
+    students = 0
+    if mode != 'float32' and len(user_ids):
+        arrays['centroid_ids'], arrays['offsets'], centroids = student_centroids(user_ids, matrix)
+        arrays['centroids'], arrays['scales'] = quantize(centroids, mode)
+        students = len(arrays['centroid_ids'])
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, version, matrix.shape[0], matrix.shape[1], students, MODES.index(mode))
+                .ljust(HEADER_SIZE, b'\0'))
+        for name, dtype, _ in _sections(matrix.shape[0], matrix.shape[1], students, mode):
+            f.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def map_gallery(path):
+    """Gallery whose arrays are read-only views of the mapped file."""
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    magic, version, rows, dim, students, mode = HEADER.unpack(bytes(data[:HEADER.size]))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a face gallery file")
+    arrays, offset = dict.fromkeys(Gallery._fields), HEADER_SIZE
+    for name, dtype, shape in _sections(rows, dim, students, MODES[mode]):
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        # Plain ndarray views: memmap slices carry per-slice overhead in the hot loops
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=data, offset=offset)
+        offset += size
+    arrays.update(version=version, mode=MODES[mode])
+    return Gallery(**arrays)
+
+
+def _centroid_scores(gallery, probes):
+    scores = np.empty((len(probes), len(gallery.centroid_ids)), dtype=np.float32)
+    step = max(16, CENTROID_BLOCK_BYTES // (4 * gallery.centroids.shape[1]))
+    for start in range(0, len(gallery.centroid_ids), step):
+        scores[:, start:start + step] = probes @ gallery.centroids[start:start + step].astype(np.float32).T
+    if gallery.mode == 'int8':
+        scores *= gallery.scales
+    return scores
+
+
+def nearest(gallery, embeddings, candidates=20, stats=None, allowed=None):
+    """(user id, cosine distance) of the closest enrolled embedding for each of
+    `embeddings` (normalised vectors). Full galleries are scanned exactly;
+    compact ones shortlist `candidates` students by centroid and re-rank
+    their float32 rows. `allowed` (user ids), if given, restricts the match to
+    those students, so that nobody outside it can take a face from them.
+    `stats`, if given, receives the rows scored."""
+    stats = {} if stats is None else stats
+    stats["rows_searched"] = 0
+    if not embeddings or not len(gallery.user_ids):
+        return []
+    probes = np.vstack(embeddings).astype(np.float32)
+    allowed = None if allowed is None else np.fromiter(allowed, dtype=np.int64)
+    if gallery.centroid_ids is None:
+        rows = np.arange(len(gallery.user_ids)) if allowed is None else np.flatnonzero(np.isin(gallery.user_ids, allowed))
+        if not len(rows):
+            return []
+        stats["rows_searched"] = len(probes) * len(rows)
+        scores = probes @ (gallery.matrix if allowed is None else gallery.matrix[rows]).T
+        best = scores.argmax(axis=1)
+        return [(int(gallery.user_ids[rows[i]]), 1.0 - float(scores[row, i])) for row, i in enumerate(best)]
+    centroid_scores = _centroid_scores(gallery, probes)
+    eligible = len(gallery.centroid_ids)
+    if allowed is not None:
+        outside = ~np.isin(gallery.centroid_ids, allowed)
+        centroid_scores[:, outside] = -np.inf
+        eligible -= int(outside.sum())
+    k = min(candidates, eligible)
+    if not k:
+        return []
+    shortlist = np.argpartition(-centroid_scores, k - 1, axis=1)[:, :k]
+    matches = []
+    stats["rows_searched"] = len(probes) * len(gallery.centroid_ids)
+    for probe, students in zip(probes, shortlist):
+        rows = np.concatenate([np.arange(gallery.offsets[s], gallery.offsets[s + 1]) for s in students])
+        stats["rows_searched"] += len(rows)
+        scores = gallery.matrix[rows] @ probe
+        best = scores.argmax()
+        matches.append((int(gallery.user_ids[rows[best]]), 1.0 - float(scores[best])))
+    return matches
+
+
+def search(gallery, embeddings, threshold, candidates=20, stats=None, allowed=None):
+    """User IDs recognised among `embeddings`: nearest matches within `threshold`."""
+    return {user_id for user_id, distance in nearest(gallery, embeddings, candidates, stats, allowed)
+            if distance <= threshold}
+
+
+class SharedGallery:
+    """Per-process handle on the gallery file of one model under `directory`."""
+
+    def __init__(self, directory, model_name, mode='float32'):
+        if mode not in MODES:
+            raise ValueError(f"Unsupported gallery mode {mode!r}; use one of {MODES}")
+        self.directory = directory
+        self.model_name = model_name
+        self.mode = mode
+        self.prefix = re.sub(r'[^A-Za-z0-9_-]', '_', model_name)
+        self.pointer = os.path.join(directory, f"{self.prefix}.current")
+        self._lock = threading.Lock()
+        self._stat = None
+        self._mapped = None
+        self._scheduled = False
+        self._schedule_lock = threading.Lock()
+
+    def _read_pointer(self):
+        with open(self.pointer) as f:
+            return f.read().strip()
+
+    def get(self):
+        """The live Gallery, or None before the first publish."""
+        try:
+            st = os.stat(self.pointer)
+        except FileNotFoundError:
+            return None
+        stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stat != self._stat:
+            with self._lock:
+                if stat != self._stat:
+                    try:
+                        self._mapped = map_gallery(os.path.join(self.directory, self._read_pointer()))
+                    except FileNotFoundError:
+                        # Two publishes since the pointer was read; it names a newer file now
+                        self._mapped = map_gallery(os.path.join(self.directory, self._read_pointer()))
+                    self._stat = stat
+        return self._mapped
+
+    def publish(self):
+        """Rebuild the gallery file from the database if its version stamp or mode changed.
+        Call after the enrollment change is committed. Returns the live version."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{self.prefix}.lock"), 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            stamp = db.session.get(VersionStamp, version_key(self.model_name))
+            version = stamp.version if stamp else 0
+            current = self.get()
+            if current is not None and current.version == version and current.mode == self.mode:
+                return version
+            user_ids, matrix = load_gallery(self.model_name)
+            name = f"{self.prefix}.v{version}.{self.mode}.gallery"
+            write_gallery(os.path.join(self.directory, name), version, user_ids, matrix, self.mode)
+            previous = self._read_pointer() if os.path.exists(self.pointer) else None
+            tmp = f"{self.pointer}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                f.write(name)
+            os.replace(tmp, self.pointer)
+            # The replaced version stays for one cycle: a worker may have read the old pointer and
+            # not opened the file yet. Workers still mapping an older one keep it readable (POSIX)
+            for entry in os.listdir(self.directory):
+                if entry.startswith(f"{self.prefix}.v") and entry.endswith('.gallery') and entry not in (name, previous):
+                    try:
+                        os.remove(os.path.join(self.directory, entry))
+                    except OSError:
+                        pass
+            return version
+
+    def publish_soon(self, app, delay):
+        """publish() from a background thread `delay` seconds from now; calls made meanwhile
+        share that rebuild. With delay 0, publishes in the calling thread."""
+        if not delay:
+            return self.publish()
+        with self._schedule_lock:
+            if self._scheduled:
+                return None
+            self._scheduled = True
+
+        def run():
+            time.sleep(delay)
+            # Cleared before the rebuild, so a change committed while it runs schedules another
+            with self._schedule_lock:
+                self._scheduled = False
+            with app.app_context():
+                try:
+                    self.publish()
+                except Exception as e:
+                    # Enrollment is committed; the next publish (or `flask publish-face-gallery`) catches up
+                    print("Failed to publish face gallery: " + str(e))
+                finally:
+                    db.session.remove()
+
+        threading.Thread(target=run, name='face-gallery-publish', daemon=True).start()
+        return None
+
+    def current(self):
+        """Like get(), but builds the file on first use (e.g. an existing database)."""
+        gallery = self.get()
+        if gallery is None:
+            self.publish()
+            gallery = self.get()
+        return gallery
@@ -0,0 +1,216 @@
+# File: backend/face_inference.py
+"""
+CPU inference backends for the face embedding model.
+
+FACE_INFERENCE_BACKEND picks what runs FACE_MODEL_NAME when faces are
+embedded (recognition and enrollment alike):
+
+- 'deepface' (default): DeepFace.represent, i.e. Keras on TensorFlow.
+- 'tflite': a model exported with `flask export-face-model`, run by the
+  TFLite interpreter that ships with TensorFlow.
+- 'onnx': the same, run by ONNX Runtime (optional dependency).
+
+The exported runtimes load in a fraction of the time, skip Keras' per-call
+overhead and can carry int8 weights. FACE_INFERENCE_THREADS caps the
+intra-op threads of whichever backend runs; with several gunicorn workers
+on one host, workers x threads should not exceed the cores.
+
+All backends are fed what DeepFace builds for detector 'skip': the aligned
+crop in BGR, scaled into the model input with black padding, values 0-1.
+An exported model should pass bench_face_inference.py against the
+reference before it is deployed, since the stored gallery was embedded by
+the reference model.
+"""
+import os
+import threading
+
+import cv2
+import numpy as np
+from deepface import DeepFace
+
+try:
+    import onnxruntime
+except ImportError:  # optional: only needed for FACE_INFERENCE_BACKEND='onnx'
+    onnxruntime = None
+
+BACKENDS = ('deepface', 'tflite', 'onnx')
+# Faces per forward pass of the exported runtimes
+BATCH_SIZE = 16
+
+
+def _normalized_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32).reshape(len(matrix), -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return list(matrix / np.where(norms > 0, norms, 1.0))
+
+
+def preprocess(crops, size):
+    """Batch of face crops (RGB, 0-1 floats) as DeepFace feeds them to a model
+    whose input is `size` (height, width): BGR, aspect kept, padded with black."""
+    height, width = size
+    batch = np.zeros((len(crops), height, width, 3), dtype=np.float32)
+    for i, crop in enumerate(crops):
+        bgr = np.asarray(crop)[:, :, ::-1]
+        factor = min(height / bgr.shape[0], width / bgr.shape[1])
+        resized = cv2.resize(bgr, (int(bgr.shape[1] * factor), int(bgr.shape[0] * factor)))
+        top, left = (height - resized.shape[0]) // 2, (width - resized.shape[1]) // 2
+        batch[i, top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return batch
+
+
+class DeepFaceBackend:
+    """The reference: Keras through DeepFace."""
+
+    name = 'deepface'
+
+    def __init__(self, model_name, threads=0):
+        self.model_name = model_name
+        if threads:
+            import tensorflow as tf
+            try:
+                tf.config.threading.set_intra_op_parallelism_threads(threads)
+                tf.config.threading.set_inter_op_parallelism_threads(1)
+            except RuntimeError:
+                # TensorFlow has already run something in this process; its pools are fixed
+                pass
+
+    def embed(self, crops):
+        """Normalised embeddings of aligned face crops (RGB, 0-1 floats), in one batch."""
+        if not len(crops):
+            return []
+        # 'skip': the crops are already detected and aligned; DeepFace expects BGR input
+        represented = DeepFace.represent(img_path=[crop[:, :, ::-1] for crop in crops], model_name=self.model_name,
+                                         detector_backend='skip', enforce_detection=False)
+        return _normalized_rows([result[0]['embedding'] if isinstance(result, list) else result['embedding']
+                                 for result in represented])
+
+
+class TFLiteBackend:
+    name = 'tflite'
+
+    def __init__(self, path, threads=0):
+        import tensorflow as tf
+        self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=threads or None)
+        self.input = self.interpreter.get_input_details()[0]['index']
+        self.output = self.interpreter.get_output_details()[0]['index']
+        self.size = tuple(int(n) for n in self.interpreter.get_input_details()[0]['shape'][1:3])
+        self._shape = None
+        # An interpreter holds its tensors; requests share it one at a time
+        self._lock = threading.Lock()
+
+    def embed(self, crops):
+        outputs = []
+        with self._lock:
+            for start in range(0, len(crops), BATCH_SIZE):
+                batch = preprocess(crops[start:start + BATCH_SIZE], self.size)
+                if batch.shape != self._shape:
+                    self.interpreter.resize_tensor_input(self.input, batch.shape)
+                    self.interpreter.allocate_tensors()
+                    self._shape = batch.shape
+                self.interpreter.set_tensor(self.input, batch)
+                self.interpreter.invoke()
+                outputs.append(self.interpreter.get_tensor(self.output).copy())
+        return _normalized_rows(np.vstack(outputs)) if outputs else []
+
+
+class OnnxBackend:
+    name = 'onnx'
+
+    def __init__(self, path, threads=0):
+        if onnxruntime is None:
+            raise RuntimeError("FACE_INFERENCE_BACKEND='onnx' needs onnxruntime (pip install onnxruntime)")
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input = model_input.name
+        self.size = tuple(int(n) for n in model_input.shape[1:3])
+
+    def embed(self, crops):
+        # InferenceSession.run is thread-safe
+        outputs = [self.session.run(None, {self.input: preprocess(crops[start:start + BATCH_SIZE], self.size)})[0]
+                   for start in range(0, len(crops), BATCH_SIZE)]
+        return _normalized_rows(np.vstack(outputs)) if outputs else []
+
+
+def create_backend(name, model_name, path='', threads=0):
+    if name == 'deepface':
+        return DeepFaceBackend(model_name, threads)
+    if name not in BACKENDS:
+        raise ValueError(f"Unsupported inference backend {name!r}; use one of {BACKENDS}")
+    if not path or not os.path.exists(path):
+        raise ValueError(f"FACE_INFERENCE_BACKEND={name!r} needs FACE_INFERENCE_MODEL_PATH (see `flask export-face-model`)")
+    return TFLiteBackend(path, threads) if name == 'tflite' else OnnxBackend(path, threads)
+
+
+_loaded = {'pid': None, 'backends': {}}
+_loaded_lock = threading.Lock()
+
+
+def get_backend(config):
+    """The process's backend for the FACE_INFERENCE_* settings, loaded on first use."""
+    key = (config['FACE_INFERENCE_BACKEND'], config['FACE_MODEL_NAME'], config['FACE_INFERENCE_MODEL_PATH'],
+           config['FACE_INFERENCE_THREADS'])
+    with _loaded_lock:
+        if _loaded['pid'] != os.getpid():
+            _loaded.update(pid=os.getpid(), backends={})
+        if key not in _loaded['backends']:
+            _loaded['backends'][key] = create_backend(*key)
+        return _loaded['backends'][key]
+
+
+def _keras_model(model_name):
+    model = DeepFace.build_model(model_name).model
+    return model, tuple(int(n) for n in model.input_shape[1:3])
+
+
+def _calibration_batches(directory, size, detector, limit=200):
+    # Representative inputs for int8 activation ranges: faces from real photos
+    from face_enrollment import IMAGE_EXTENSIONS
+    count = 0
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if not name.lower().endswith(IMAGE_EXTENSIONS) or count >= limit:
+                continue
+            faces = DeepFace.extract_faces(img_path=os.path.join(root, name), detector_backend=detector,
+                                           enforce_detection=False, align=True)
+            for face in faces:
+                count += 1
+                yield [preprocess([face['face']], size)]
+
+
+def export_tflite(model_name, path, int8=False, calibration=None, detector='opencv'):
+    """Write `model_name` as a TFLite model with a dynamic batch dimension.
+    int8 quantizes the weights, and the activations too when `calibration`
+    names a directory of photos; inputs and outputs stay float32."""
+    import tensorflow as tf
+    model, size = _keras_model(model_name)
+    spec = tf.TensorSpec((None, size[0], size[1], 3), tf.float32)
+    function = tf.function(lambda x: model(x, training=False)).get_concrete_function(spec)
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([function], model)
+    if int8:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if calibration:
+            converter.representative_dataset = lambda: _calibration_batches(calibration, size, detector)
+    with open(path, 'wb') as f:
+        f.write(converter.convert())
+    return size
+
+
+def export_onnx(model_name, path, int8=False):
+    """Write `model_name` as an ONNX model (needs tf2onnx); int8 quantizes the
+    weights dynamically with onnxruntime.quantization."""
+    import tensorflow as tf
+    import tf2onnx
+    model, size = _keras_model(model_name)
+    spec = [tf.TensorSpec((None, size[0], size[1], 3), tf.float32, name='input')]
+    target = f"{path}.float32.tmp" if int8 else path
+    tf2onnx.convert.from_keras(model, input_signature=spec, output_path=target)
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(target, path, weight_type=QuantType.QInt8)
+        os.remove(target)
+    return size
@@ -0,0 +1,149 @@
+# File: backend/face_video.py
+"""
+Attendance from a short video pan of the classroom.
+
+Frames are decoded as a stream (cv2.VideoCapture, one frame in memory at a
+time) and only FACE_VIDEO_SAMPLE_FPS frames per second are decoded fully;
+the others are grabbed and dropped. FACE_DETECTOR runs on each sampled
+frame and a lightweight IoU tracker links the detections into tracks, with
+a constant-velocity guess of where each face moved since it was last seen
+so that a panning camera does not break them. A track keeps only its
+FACE_VIDEO_EMBEDDINGS_PER_TRACK best crops (sharpest and largest), and
+those are embedded in one batch at the end and averaged: one or two
+forward passes per person instead of one per face per frame. Tracks seen
+fewer than FACE_VIDEO_MIN_TRACK_HITS times are treated as false detections.
+"""
+import cv2
+
+from face_detection import StageTimer, embed, extract
+from face_enrollment import normalize, sharpness
+
+
+class _Track:
+    def __init__(self, face, frame):
+        self.box = _box(face)
+        self.velocity = (0.0, 0.0)
+        self.last_frame = frame
+        self.hits = 1
+        self.best = []
+
+    def predicted(self, frame):
+        x, y, w, h = self.box
+        steps = frame - self.last_frame
+        return x + self.velocity[0] * steps, y + self.velocity[1] * steps, w, h
+
+    def update(self, face, frame):
+        box = _box(face)
+        steps = max(1, frame - self.last_frame)
+        self.velocity = ((box[0] - self.box[0]) / steps, (box[1] - self.box[1]) / steps)
+        self.box, self.last_frame = box, frame
+        self.hits += 1
+
+    def offer(self, face, score, keep):
+        self.best = sorted(self.best + [(score, face)], key=lambda entry: entry[0], reverse=True)[:keep]
+
+
+def _box(face):
+    return face.area['x'], face.area['y'], face.area['w'], face.area['h']
+
+
+def _iou(a, b):
+    iw = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    ih = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    return inter / (a[2] * a[3] + b[2] * b[3] - inter)
+
+
+def associate(tracks, faces, frame, min_iou):
+    """Greedy IoU matching of `faces` to the predicted track boxes:
+    ([(track, face)], unmatched faces)."""
+    pairs = sorted(((_iou(track.predicted(frame), _box(face)), t, f)
+                    for t, track in enumerate(tracks) for f, face in enumerate(faces)), reverse=True)
+    used_tracks, used_faces, matched = set(), set(), []
+    for iou, t, f in pairs:
+        if iou < min_iou:
+            break
+        if t in used_tracks or f in used_faces:
+            continue
+        used_tracks.add(t)
+        used_faces.add(f)
+        matched.append((tracks[t], faces[f]))
+    return matched, [face for f, face in enumerate(faces) if f not in used_faces]
+
+
+def sampled_frames(path, sample_fps, max_seconds):
+    """(frame index, BGR frame) for about `sample_fps` frames per second of the video."""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError("Unreadable video")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        step = max(1, int(round(fps / sample_fps)))
+        last = int(fps * max_seconds)
+        index = 0
+        while index < last and capture.grab():
+            if index % step == 0:
+                ok, frame = capture.retrieve()
+                if ok:
+                    yield index // step, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def recognize_video(path, config, timer=None):
+    """Embeddings of the people tracked through a video, one per track, and a
+    report in the shape of face_detection.recognize_faces()."""
+    timer = timer or StageTimer()
+    min_size, min_sharpness = config['FACE_RECOGNITION_MIN_SIZE'], config['FACE_RECOGNITION_MIN_SHARPNESS']
+    keep = config['FACE_VIDEO_EMBEDDINGS_PER_TRACK']
+    active, finished = [], []
+    frames = detections = 0
+    rejected = {"small": 0, "blurred": 0}
+    stream = sampled_frames(path, config['FACE_VIDEO_SAMPLE_FPS'], config['FACE_VIDEO_MAX_SECONDS'])
+    while True:
+        with timer.stage('decode'):
+            item = next(stream, None)
+        if item is None:
+            break
+        frame, image = item
+        frames += 1
+        with timer.stage('detect_fast'):
+            faces = extract(image, config['FACE_DETECTOR'])
+        detections += len(faces)
+        with timer.stage('track'):
+            matched, new = associate(active, faces, frame, config['FACE_VIDEO_TRACK_IOU'])
+            for track, face in matched:
+                track.update(face, frame)
+            for face in new:
+                track = _Track(face, frame)
+                active.append(track)
+                matched.append((track, face))
+        with timer.stage('quality'):
+            for track, face in matched:
+                size = min(face.area['w'], face.area['h'])
+                if size < min_size:
+                    rejected["small"] += 1
+                    continue
+                score = sharpness(face.image)
+                if score < min_sharpness:
+                    rejected["blurred"] += 1
+                    continue
+                # Prefer sharp, large crops; the crop is only kept while among the track's best
+                track.offer(face, score * size, keep)
+        # A track not seen for a while has left the frame
+        stale = [track for track in active if frame - track.last_frame > config['FACE_VIDEO_TRACK_MAX_AGE']]
+        finished.extend(stale)
+        active = [track for track in active if track not in stale]
+    finished.extend(active)
+
+    tracks = [track for track in finished if track.hits >= config['FACE_VIDEO_MIN_TRACK_HITS'] and track.best]
+    with timer.stage('embed'):
+        crops = [face for track in tracks for _, face in track.best]
+        vectors = iter(embed(crops, config))
+        embeddings = [normalize(sum(next(vectors) for _ in track.best)) for track in tracks]
+    report = {"frames": frames, "detections": detections, "tracks": len(tracks),
+              "rejected": rejected, "embedded": len(crops), "faces": len(embeddings)}
+    return embeddings, report
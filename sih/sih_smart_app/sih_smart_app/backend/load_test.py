@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Load test and latency regression check for the attendance-day workflow.
+
+Each virtual teacher repeatedly runs the same sequence the app does on a
+teaching day: login -> today's timetable -> class roster -> (optionally)
+mark_attendance with a photo -> save_attendance -> a student's attendance
+stats. Per-endpoint throughput and p50/p95/p99 latencies are reported and
+can be compared with a stored baseline; the script exits with status 1 on
+errors or when an endpoint is slower than the baseline allows.
+
+By default the app runs in-process through the Flask test client on a
+temporary database filled by synthetic_data.py. With --url it drives a
+running server instead (e.g. `gunicorn -w 4 app:app`); teachers are then
+read from the server's DATABASE_URL, which must hold generated data.
+
+    python load_test.py --students 2000 --users 8 --iterations 20 --save-baseline baseline.json
+    python load_test.py --students 2000 --users 8 --iterations 20 --baseline baseline.json
+    python load_test.py --url http://127.0.0.1:8000 --users 16 --baseline baseline.json
+"""
+
+import argparse
+import json
+import mimetypes
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = ["login", "timetable_today", "roster", "mark_attendance", "save_attendance", "student_stats"]
+
+
+class InProcessClient:
+    """Flask test client, one per thread. Talisman only accepts https URLs."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, json_body=None, headers=None, files=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        data = None
+        if files:
+            data = {name: (open(path_, 'rb'), os.path.basename(path_)) for name, path_ in files.items()}
+        response = client.open('https://localhost' + path, method=method, json=json_body, data=data, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HTTPClient:
+    """Plain urllib client for a server started separately."""
+
+    def __init__(self, base_url, timeout=30.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, json_body=None, headers=None, files=None):
+        # The server sits behind Talisman; pretend a TLS proxy terminated the connection
+        headers = dict(headers or {}, **{'X-Forwarded-Proto': 'https'})
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif files:
+            boundary = uuid.uuid4().hex
+            parts = []
+            for name, file_path in files.items():
+                with open(file_path, 'rb') as f:
+                    content = f.read()
+                content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+                parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                             f'filename="{os.path.basename(file_path)}"\r\nContent-Type: {content_type}\r\n\r\n'.encode()
+                             + content + b'\r\n')
+            body = b''.join(parts) + f'--{boundary}--\r\n'.encode()
+            headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, None
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def call(self, name, client, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            status, body = client.request(method, path, **kwargs)
+        except Exception as e:
+            status, body = None, {"message": str(e)}
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed)
+            if status is None or status >= 400:
+                self.errors.setdefault(name, []).append(f"{status}: {(body or {}).get('message')}")
+        return status, body
+
+    def summary(self, wall_seconds):
+        report = {}
+        for name in ENDPOINTS:
+            samples = sorted(self.samples.get(name, []))
+            if not samples:
+                continue
+            report[name] = {
+                "count": len(samples),
+                "errors": len(self.errors.get(name, [])),
+                "throughput": round(len(samples) / wall_seconds, 2),
+                "p50": round(samples[int(len(samples) * 0.50)], 2),
+                "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+                "p99": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 2),
+            }
+        return report
+
+
+def teacher_plan(limit, password):
+    """(college_id, institution_id, password, class ids) for up to `limit` teachers with classes.
+    Today's classes come first so the timetable step returns real work."""
+    from models import ClassSchedule, User
+    from synthetic_data import DEMO_PASSWORDS
+
+    weekday = time.localtime().tm_wday
+    plan = []
+    teachers = User.query.filter_by(role='teacher').order_by(User.id).all()
+    for teacher in teachers:
+        classes = ClassSchedule.query.filter_by(teacher_id=teacher.id).order_by(ClassSchedule.day_of_week != weekday, ClassSchedule.id).all()
+        if classes:
+            plan.append((teacher.college_id, teacher.institution_id, password or DEMO_PASSWORDS['teacher'], [c.id for c in classes]))
+        if len(plan) == limit:
+            break
+    return plan
+
+
+def attendance_day(client, recorder, teacher, iterations, photo=None):
+    college_id, institution_id, password, class_ids = teacher
+    for i in range(iterations):
+        status, body = recorder.call("login", client, 'POST', '/api/login',
+                                     json_body={"college_id": college_id, "password": password, "institution_id": institution_id})
+        if status != 200:
+            return
+        headers = {"Authorization": "Bearer " + body["token"]}
+        teacher_id = body["user_id"]
+
+        status, todays = recorder.call("timetable_today", client, 'GET', f'/api/teacher/{teacher_id}/timetable/today', headers=headers)
+        # On a day without classes, fall back to the teacher's other classes
+        todays_ids = [c["id"] for c in todays] if status == 200 and todays else []
+        class_id = (todays_ids or class_ids)[i % len(todays_ids or class_ids)]
+
+        status, roster = recorder.call("roster", client, 'GET', f'/api/class/{class_id}/roster', headers=headers)
+        if status != 200 or not roster:
+            continue
+
+        if photo:
+            recorder.call("mark_attendance", client, 'POST', '/api/mark_attendance',
+                          headers=headers, files={"attendance_photo": photo})
+
+        attendance = {s["id"]: (n + i) % 5 != 0 for n, s in enumerate(roster)}
+        recorder.call("save_attendance", client, 'POST', '/api/save_attendance',
+                      json_body={"class_id": class_id, "attendance": attendance}, headers=headers)
+
+        student = roster[i % len(roster)]
+        recorder.call("student_stats", client, 'GET', f'/api/student/{student["id"]}/attendance/stats', headers=headers)
+
+
+def run(client, plan, users, iterations, photo=None):
+    recorder = Recorder()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        futures = [pool.submit(attendance_day, client, recorder, plan[u % len(plan)], iterations, photo)
+                   for u in range(users)]
+        for future in futures:
+            future.result()
+    return recorder, time.perf_counter() - started
+
+
+def compare(report, baseline, tolerance):
+    """List of regressions: p50/p95 above baseline * tolerance or throughput below baseline / tolerance."""
+    regressions = []
+    for name, base in baseline.items():
+        current = report.get(name)
+        if current is None:
+            continue
+        for metric in ("p50", "p95"):
+            if current[metric] > base[metric] * tolerance:
+                regressions.append(f"{name} {metric}: {current[metric]:.1f}ms > {base[metric]:.1f}ms x {tolerance}")
+        if current["throughput"] < base["throughput"] / tolerance:
+            regressions.append(f"{name} throughput: {current['throughput']:.1f}/s < {base['throughput']:.1f}/s / {tolerance}")
+    return regressions
+
+
+def setup_in_process(args):
+    # Must happen before app/config are imported
+    workdir = tempfile.mkdtemp(prefix='omniattend-load-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    # The app refuses to start without a key; a throwaway one is enough for a test database
+    os.environ.setdefault('SECRET_KEY', secrets.token_hex(32))
+    os.environ.setdefault('SUGGESTION_CACHE_PATH', os.path.join(workdir, 'suggestions.db'))
+    if args.hash_method:
+        os.environ['PASSWORD_HASH_METHOD'] = args.hash_method
+
+    from app import app
+    from models import db
+    from synthetic_data import generate_dataset
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        generate_dataset(seed=args.seed, students=args.students, branches=args.branches, weeks=args.weeks)
+        plan = teacher_plan(args.users, args.password)
+    return InProcessClient(app), plan
+
+
+def setup_http(args):
+    from app import app
+
+    with app.app_context():
+        plan = teacher_plan(args.users, args.password)
+    return HTTPClient(args.url), plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="base URL of a running server; default runs the app in-process")
+    parser.add_argument('--users', type=int, default=4, help="concurrent virtual teachers")
+    parser.add_argument('--iterations', type=int, default=10, help="attendance-day loops per virtual teacher")
+    parser.add_argument('--photo', help="image to send to mark_attendance (skipped when omitted)")
+    parser.add_argument('--password', help="teacher password (defaults to the generated demo password)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--students', type=int, default=1000, help="in-process dataset size")
+    parser.add_argument('--branches', type=int, default=3)
+    parser.add_argument('--weeks', type=int, default=16)
+    parser.add_argument('--hash-method', default='pbkdf2:sha256:600000',
+                        help="password hash for the in-process dataset; lower it to keep login from dominating")
+    parser.add_argument('--baseline', help="fail if results regress against this JSON report")
+    parser.add_argument('--save-baseline', help="write the results to this JSON file")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="allowed slowdown factor against the baseline")
+    args = parser.parse_args()
+
+    client, plan = setup_http(args) if args.url else setup_in_process(args)
+    if not plan:
+        sys.exit("No teachers with classes found; generate data first (init_college_data.py)")
+
+    recorder, wall = run(client, plan, args.users, args.iterations, args.photo)
+    report = recorder.summary(wall)
+
+    print(f"{args.users} users x {args.iterations} iterations in {wall:.1f}s")
+    print(f"{'endpoint':<18}{'count':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, row in report.items():
+        print(f"{name:<18}{row['count']:>7}{row['errors']:>8}{row['throughput']:>9.1f}"
+              f"{row['p50']:>9.1f}{row['p95']:>9.1f}{row['p99']:>9.1f}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    failed = False
+    for name, messages in recorder.errors.items():
+        failed = True
+        print(f"ERROR {name}: {len(messages)} failed requests, e.g. {messages[0]}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
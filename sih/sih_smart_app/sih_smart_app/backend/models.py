@@ -16,9 +16,14 @@ class Institution(db.Model):
     admin_id = db.Column(db.Integer, db.ForeignKey('user.id', use_alter=True), nullable=True)
 
 class User(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('institution_id', 'college_id', name='uq_user_institution_college_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    college_id = db.Column(db.String(50), nullable=False)
-    password = db.Column(db.String(120), nullable=False)
+    college_id = db.Column(db.String(50), nullable=False, index=True)
+    # Password hash (see auth.py); long enough for scrypt/pbkdf2/bcrypt formats
+    password = db.Column(db.String(255), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     role = db.Column(db.String(20), nullable=False)
     
@@ -68,6 +73,14 @@ class ClassSchedule(db.Model):
     teacher = db.relationship('User', backref='classes_teaching')
 
 class AttendanceRecord(db.Model):
+    # Date-range reads go through these: a student's records or a class's sessions in a window
+    __table_args__ = (
+        db.Index('ix_attendance_record_student_date', 'student_id', 'date'),
+        db.Index('ix_attendance_record_class_date', 'class_id', 'date'),
+        # One mark per student per class meeting, whichever path writes it
+        db.Index('uq_attendance_record_student_class_date', 'student_id', 'class_id', 'date', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     class_id = db.Column(db.Integer, db.ForeignKey('class_schedule.id'), nullable=False)
@@ -75,4 +88,123 @@ class AttendanceRecord(db.Model):
     status = db.Column(db.String(20), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     student = db.relationship('User', backref='attendance_records')
-    class_schedule = db.relationship('ClassSchedule', backref='attendance')
\ No newline at end of file
+    class_schedule = db.relationship('ClassSchedule', backref='attendance')
+
+class StudentRoutine(db.Model):
+    # Precomputed smart_routine response, written by `flask precompute-routines`
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'date', name='uq_student_routine_student_date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    generated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class VersionStamp(db.Model):
+    # Change counters behind the ETags of cacheable GET endpoints (see version_stamps.py)
+    key = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class SyncReceipt(db.Model):
+    # Idempotency index for /api/sync/attendance: one row per applied client batch item
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'idempotency_key', name='uq_sync_receipt_user_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    idempotency_key = db.Column(db.String(64), nullable=False)
+    class_id = db.Column(db.Integer, db.ForeignKey('class_schedule.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    saved = db.Column(db.Integer, nullable=False, default=0)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AttendanceCounter(db.Model):
+    # Running per-student, per-subject totals maintained on every attendance write (see attendance_index.py)
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    percentage = db.Column(db.Float, nullable=False, default=0.0)
+
+class AttendanceSummary(db.Model):
+    # Per-student overall totals; the indexes answer "below X%" per institution, branch or semester
+    __table_args__ = (
+        db.Index('ix_attendance_summary_institution_pct', 'institution_id', 'percentage'),
+        db.Index('ix_attendance_summary_branch_pct', 'branch_id', 'percentage'),
+        db.Index('ix_attendance_summary_semester_pct', 'semester_id', 'percentage'),
+    )
+
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    institution_id = db.Column(db.Integer, db.ForeignKey('institution.id'), nullable=False)
+    branch_id = db.Column(db.Integer, db.ForeignKey('branch.id'), nullable=True)
+    semester_id = db.Column(db.Integer, db.ForeignKey('semester.id'), nullable=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    percentage = db.Column(db.Float, nullable=False, default=0.0)
+
+class AttendanceMonthly(db.Model):
+    # Per-student, per-class totals for one calendar month; range aggregates read whole months from here
+    __table_args__ = (
+        db.Index('ix_attendance_monthly_class_month', 'class_id', 'month'),
+    )
+
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    class_id = db.Column(db.Integer, db.ForeignKey('class_schedule.id'), primary_key=True)
+    # First day of the month
+    month = db.Column(db.Date, primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    present = db.Column(db.Integer, nullable=False, default=0)
+
+class FaceEmbedding(db.Model):
+    # One enrolled face per row: an L2-normalised float32 vector from FACE_MODEL_NAME (see face_enrollment.py)
+    __table_args__ = (
+        db.Index('ix_face_embedding_model_user', 'model_name', 'user_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    model_name = db.Column(db.String(50), nullable=False)
+    embedding = db.Column(db.LargeBinary, nullable=False)
+    # Quality of the source image at enrollment: face width in pixels and Laplacian variance
+    face_size = db.Column(db.Integer, nullable=False)
+    sharpness = db.Column(db.Float, nullable=False)
+    source = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AttendanceSession(db.Model):
+    # Photos of one class meeting gathered before attendance is written (see attendance_session.py)
+    __table_args__ = (
+        db.UniqueConstraint('class_id', 'date', name='uq_attendance_session_class_date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    class_id = db.Column(db.Integer, db.ForeignKey('class_schedule.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # 'open' while photos are added, 'finalized' once AttendanceRecords are written
+    status = db.Column(db.String(20), nullable=False, default='open')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finalized_at = db.Column(db.DateTime, nullable=True)
+    class_schedule = db.relationship('ClassSchedule')
+
+class SessionPhoto(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('attendance_session.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=True)
+    # 'pending' until a background thread has recognised it, then 'processed' or 'failed'
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    faces = db.Column(db.Integer, nullable=False, default=0)
+    message = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SessionFace(db.Model):
+    # One embedded face of a session photo and its nearest enrolled student, matched or not
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('attendance_session.id'), nullable=False, index=True)
+    photo_id = db.Column(db.Integer, db.ForeignKey('session_photo.id'), nullable=False)
+    embedding = db.Column(db.LargeBinary, nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    distance = db.Column(db.Float, nullable=True)
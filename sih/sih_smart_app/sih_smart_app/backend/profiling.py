@@ -0,0 +1,205 @@
+# File: backend/profiling.py
+"""
+Per-stage profiling of the recognition endpoints.
+
+Every recognition request is timed stage by stage with
+face_detection.StageTimer: reading the upload, decoding, detection,
+quality gate, embedding, gallery search and serialising the response. The
+response carries the timings in its "pipeline" block and in a
+Server-Timing header, which browser dev tools show next to the request.
+
+The same timings, with the faces detected and embedded and the gallery
+rows searched, feed Prometheus-style histograms. Each worker accumulates
+them in memory and adds its deltas to a shared SQLite file at most every
+METRICS_FLUSH_INTERVAL seconds, so /metrics reports all workers together.
+It and the captures below are served only to requests carrying
+METRICS_TOKEN.
+
+When PROFILING_ENABLED is set, a request can be captured with
+?profile=1: SamplingProfiler records the request thread's stack every
+PROFILING_INTERVAL seconds and the folded stacks (flamegraph.pl / speedscope input) are written to
+PROFILE_DIR. Work done in other processes, such as tiled detection, shows
+up as waiting on its futures.
+"""
+import atexit
+import os
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS histogram_buckets (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (name, labels, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS histogram_totals (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    sum REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (name, labels)
+) WITHOUT ROWID;
+"""
+
+# name: (help, upper bucket bounds); a final +Inf bucket is implied
+HISTOGRAMS = {
+    'recognition_stage_seconds': ("Wall time of each recognition stage",
+                                  (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)),
+    'recognition_faces': ("Faces per recognition request",
+                          (0, 1, 2, 5, 10, 20, 50, 100, 200)),
+    'recognition_gallery_rows_searched': ("Gallery rows scored per recognition request",
+                                          (100, 1000, 10000, 100000, 1000000)),
+}
+
+
+def server_timing(timings_ms):
+    """Server-Timing header value for {stage: milliseconds}."""
+    return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in timings_ms.items())
+
+
+class Histograms:
+    def __init__(self, path, flush_interval=5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._pending = {}
+        self._flushed = time.monotonic()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        atexit.register(self.flush)
+
+    @property
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def observe(self, name, value, **labels):
+        bounds = HISTOGRAMS[name][1]
+        key = (name, ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())))
+        with self._lock:
+            buckets, total, count = self._pending.get(key) or ([0] * (len(bounds) + 1), 0.0, 0)
+            buckets[bisect_left(bounds, value)] += 1
+            self._pending[key] = (buckets, total + value, count + 1)
+            due = time.monotonic() - self._flushed >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Add this process's observations since the last flush to the shared file."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed = time.monotonic()
+        if not pending:
+            return
+        buckets = [(name, labels, i, n) for (name, labels), (counts, _, _) in pending.items()
+                   for i, n in enumerate(counts) if n]
+        totals = [(name, labels, total, count) for (name, labels), (_, total, count) in pending.items()]
+        conn = None
+        try:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT INTO histogram_buckets VALUES (?, ?, ?, ?) ON CONFLICT (name, labels, bucket) "
+                             "DO UPDATE SET count = count + excluded.count", buckets)
+            conn.executemany("INSERT INTO histogram_totals VALUES (?, ?, ?, ?) ON CONFLICT (name, labels) "
+                             "DO UPDATE SET sum = sum + excluded.sum, count = count + excluded.count", totals)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            # Metrics are best effort; the observations are dropped rather than slowing requests
+            print("Failed to flush metrics: " + str(e))
+            # Not self._conn: if opening the file is what failed, that would raise again
+            if conn is not None and conn.in_transaction:
+                conn.execute("ROLLBACK")
+
+    def render(self):
+        """All workers' histograms in the Prometheus text exposition format."""
+        self.flush()
+        conn = self._conn
+        buckets = {}
+        for name, labels, bucket, count in conn.execute("SELECT name, labels, bucket, count FROM histogram_buckets"):
+            buckets.setdefault((name, labels), {})[bucket] = count
+        totals = {(name, labels): (total, count)
+                  for name, labels, total, count in conn.execute("SELECT name, labels, sum, count FROM histogram_totals")}
+        lines = []
+        for name, (help_text, bounds) in HISTOGRAMS.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for (metric, labels), (total, count) in sorted(totals.items()):
+                if metric != name:
+                    continue
+                counts, cumulative = buckets.get((metric, labels), {}), 0
+                prefix = labels + "," if labels else ""
+                for i, bound in enumerate(list(bounds) + ["+Inf"]):
+                    cumulative += counts.get(i, 0)
+                    lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+                suffix = "{" + labels + "}" if labels else ""
+                lines += [f"{name}_sum{suffix} {total:.6f}", f"{name}_count{suffix} {count}"]
+        return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    """Context manager sampling the entering thread's Python stack every
+    `interval` seconds from a background thread."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+
+    def __enter__(self):
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def top(self, limit=10):
+        """[(function, share of samples)] by samples spent in the function itself."""
+        total = sum(self.stacks.values()) or 1
+        own = Counter()
+        for stack, count in self.stacks.items():
+            own[stack.rsplit(";", 1)[-1]] += count
+        return [(function, round(count / total, 3)) for function, count in own.most_common(limit)]
+
+    def save(self, directory, label, keep=20):
+        """Write the folded stacks to `directory` and return the file name;
+        only the newest `keep` captures are kept."""
+        os.makedirs(directory, exist_ok=True)
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{os.getpid()}-{label}.folded"
+        with open(os.path.join(directory, name), 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        captures = sorted(entry for entry in os.listdir(directory) if entry.endswith('.folded'))
+        for old in captures[:-keep]:
+            try:
+                os.remove(os.path.join(directory, old))
+            except OSError:
+                pass
+        return name
@@ -0,0 +1,155 @@
+# File: backend/rate_limit_storage.py
+"""
+Shared rate limiter storage for Flask-Limiter backed by a local SQLite file.
+
+Importing this module registers the ``sqlite://`` scheme with the ``limits``
+library, so every gunicorn worker pointed at the same file shares one set of
+counters. Paths follow the SQLAlchemy convention: ``sqlite:///instance/x.db``
+is relative to the working directory, ``sqlite:////var/run/x.db`` is absolute.
+"""
+import os
+import sqlite3
+import threading
+import time
+from math import floor
+
+from limits.storage.base import SlidingWindowCounterSupport, Storage, TimestampedSlidingWindow
+
+# Expired rows are swept every PURGE_INTERVAL increments so the file stays bounded
+PURGE_INTERVAL = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+# Single-statement upsert: a counter whose window has expired restarts at `amount`
+_INCR = """
+INSERT INTO counters (key, value, expires_at) VALUES (?1, ?2, ?3)
+ON CONFLICT(key) DO UPDATE SET
+    value = CASE WHEN counters.expires_at <= ?4 THEN excluded.value ELSE counters.value + excluded.value END,
+    expires_at = CASE WHEN counters.expires_at <= ?4 THEN excluded.expires_at ELSE counters.expires_at END
+RETURNING value
+"""
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Fixed-window and sliding-window-counter storage shared across processes."""
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        uri = uri or "sqlite:///instance/ratelimit.db"
+        self.path = uri[len("sqlite:///"):] or ":memory:"
+        self.timeout = float(options.pop("timeout", 5.0))
+        if self.path != ":memory:":
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._increments = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    @property
+    def _conn(self):
+        # One connection per thread and per process (gunicorn forks after import)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        conn = self._conn
+        value = conn.execute(_INCR, (key, amount, now + expiry, now)).fetchone()[0]
+        self._increments += 1
+        if self._increments % PURGE_INTERVAL == 0:
+            conn.execute("DELETE FROM counters WHERE expires_at <= ?", (now,))
+        return value
+
+    def decr(self, key, amount=1):
+        row = self._conn.execute(
+            "UPDATE counters SET value = MAX(value - ?, 0) WHERE key = ? AND expires_at > ? RETURNING value",
+            (amount, key, time.time()),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get(self, key):
+        row = self._conn.execute(
+            "SELECT value FROM counters WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT expires_at FROM counters WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def clear(self, key):
+        self._conn.execute("DELETE FROM counters WHERE key = ?", (key,))
+
+    def check(self):
+        try:
+            self._conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._conn.execute("DELETE FROM counters").rowcount
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        conn = self._conn
+        # Read-check-increment under one write lock so workers cannot overshoot
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            previous_count, previous_ttl, current_count, _ = self._get_sliding_window_info(
+                previous_key, current_key, expiry, now
+            )
+            weighted_count = previous_count * previous_ttl / expiry + current_count
+            if floor(weighted_count) + amount > limit:
+                conn.execute("COMMIT")
+                return False
+            # The current window is still needed as the previous one during the next window
+            conn.execute(_INCR, (current_key, amount, now + 2 * expiry, now)).fetchone()
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _get_sliding_window_info(self, previous_key, current_key, expiry, now):
+        previous_count = self.get(previous_key)
+        current_count = self.get(current_key)
+        if previous_count == 0:
+            previous_ttl = 0.0
+        else:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._get_sliding_window_info(previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
@@ -0,0 +1,120 @@
+# File: backend/routines.py
+"""
+Smart routine assembly, shared by the smart_routine endpoint and the
+`flask precompute-routines` batch job.
+
+The batch job precomputes tomorrow's routine for every student and stores
+it in StudentRoutine, so the morning rush is served by a single indexed read.
+The stored routine (classes, free slots, suggested tasks) is as of the batch
+run; the attendance warning is recomputed when it is served, from the running
+totals in AttendanceSummary, so attendance marked since then shows up at once.
+A profile change drops the student's stored routines.
+Students are processed per semester (one timetable query each), attendance
+comes from one grouped query per semester, and students whose profiles
+produce the same prompt share a single AI call.
+"""
+import json
+from datetime import datetime
+
+from ai_client import fallback_suggestions
+from attendance_stats import TARGET_PERCENTAGE, subject_attendance_counts, summarize_attendance
+from models import db, AttendanceSummary, Branch, ClassSchedule, Semester, StudentRoutine, Subject, User
+from suggestion_cache import attendance_bucket
+from timetable_index import timetable_index
+
+DAY_START_HOUR, DAY_END_HOUR = 9, 18
+
+
+def build_prompt(user, attendance_data, day):
+    # Built from the bucketed attendance summary so students with the same
+    # profile get the same prompt (and the same cached suggestion)
+    bucket = attendance_bucket(attendance_data)
+    below = ", ".join(bucket["below_75"]) or "none"
+    return (f"You are an academic advisor. A student's goal is '{user.career_goal}', they are weak in '{user.weak_subjects}', and interests are '{user.interests}'. "
+            f"Their overall attendance is about {bucket['overall']}%; subjects below 75%: {below}. "
+            f"Today is {day.strftime('%A')}. "
+            f"Suggest 2-3 productive, short, numbered tasks for their free periods that will help them improve in weak subjects and achieve their career goals. "
+            f"Consider their attendance statistics and suggest study tasks if below 75%. "
+            f"Example: '1. Task one. 2. Task two.'")
+
+
+def free_slots(semester_id, day):
+    # Whole hours between DAY_START_HOUR and DAY_END_HOUR with no class, from the cached bitmap
+    return timetable_index().free_slots('semester', semester_id, day.weekday(),
+                                        DAY_START_HOUR * 60, DAY_END_HOUR * 60)
+
+
+def assemble_routine(classes, slots, suggestions):
+    routine = [{"time": c.start_time, "title": c.subject.name, "type": "class"} for c in classes]
+    ai_tasks = [task.strip() for task in suggestions.split('\n') if task and task[0].isdigit()]
+    for i, task_title in enumerate(ai_tasks):
+        if i < len(slots):
+            clean_title = '. '.join(task_title.split('. ')[1:]) if '. ' in task_title else task_title
+            routine.append({"time": slots[i], "title": clean_title, "type": "task"})
+    routine.sort(key=lambda x: x['time'])
+    return [{"time": item['time'].strftime("%I:%M %p"), "title": item['title'], "type": item['type']} for item in routine]
+
+
+def attendance_warning(attendance_data):
+    if attendance_data.get("overall_percentage", 0) < TARGET_PERCENTAGE:
+        classes_needed = attendance_data.get("classes_needed_for_75_percent", 0)
+        return f"Warning: Your overall attendance is {attendance_data['overall_percentage']}%. You need to attend {classes_needed} more classes to reach 75%."
+    return None
+
+
+def routine_payload(branch, semester, routine, attendance_data, suggestions_pending=False):
+    return {
+        "branch": branch.name if branch else "N/A",
+        "semester": f"Semester {semester.number}" if semester else "N/A",
+        "routine": routine,
+        "warning_message": attendance_warning(attendance_data),
+        "ai_suggestions_pending": suggestions_pending
+    }
+
+
+def precomputed_payload(routine):
+    """The payload stored in a StudentRoutine row, with a current attendance warning."""
+    payload = json.loads(routine.payload)
+    summary = db.session.get(AttendanceSummary, routine.student_id)
+    if summary is not None:
+        payload["warning_message"] = attendance_warning(summarize_attendance({"overall": (summary.total, summary.present)}))
+    return payload
+
+
+def classes_for_day(semester_id, day):
+    return (ClassSchedule.query.join(Subject)
+            .filter(Subject.semester_id == semester_id, ClassSchedule.day_of_week == day.weekday())
+            .order_by(ClassSchedule.start_time).all())
+
+
+def precompute_routines(day, ai_client, log=print):
+    """Compute and store every student's routine for `day`. Returns (students, ai_calls)."""
+    branches = {b.id: b for b in Branch.query.all()}
+    semesters = {s.id: s for s in Semester.query.all()}
+    students = User.query.filter(User.role == 'student', User.current_semester_id.isnot(None)).all()
+    by_semester = {}
+    for student in students:
+        by_semester.setdefault(student.current_semester_id, []).append(student)
+
+    suggestions_by_prompt = {}
+    rows = []
+    for semester_id, group in by_semester.items():
+        classes = classes_for_day(semester_id, day)
+        slots = free_slots(semester_id, day)
+        counts = subject_attendance_counts(User.current_semester_id == semester_id)
+        for student in group:
+            attendance_data = summarize_attendance(counts.get(student.id, {}))
+            prompt = build_prompt(student, attendance_data, day)
+            if prompt not in suggestions_by_prompt:
+                suggestions_by_prompt[prompt] = ai_client.generate(prompt) or fallback_suggestions(student, attendance_data)
+            routine = assemble_routine(classes, slots, suggestions_by_prompt[prompt])
+            payload = routine_payload(branches.get(student.branch_id), semesters.get(semester_id), routine, attendance_data)
+            rows.append({"student_id": student.id, "date": day, "payload": json.dumps(payload), "generated_at": datetime.utcnow()})
+        log(f"Semester {semester_id}: {len(group)} students, {len(classes)} classes")
+
+    # Replace any earlier run for the same day in one transaction
+    StudentRoutine.query.filter_by(date=day).delete(synchronize_session=False)
+    if rows:
+        db.session.execute(db.insert(StudentRoutine), rows)
+    db.session.commit()
+    return len(rows), len(suggestions_by_prompt)
@@ -0,0 +1,73 @@
+# File: backend/serializers.py
+"""
+Declared response schemas for the models.
+
+A Schema maps output keys to attribute paths, optionally through a
+formatter. The declaration is compiled once into a single function that
+builds the dict with a literal, so dumping a row costs one call instead of
+per-field lookups and branching. Time and date formatting is memoized:
+a timetable only has a few dozen distinct values.
+"""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def hhmm(value):
+    return value.strftime('%H:%M')
+
+
+@lru_cache(maxsize=4096)
+def clock_12h(value):
+    return value.strftime('%I:%M %p')
+
+
+@lru_cache(maxsize=4096)
+def iso_date(value):
+    return value.strftime('%Y-%m-%d')
+
+
+def subject_label(subject):
+    return f"{subject.name} ({subject.course_code})"
+
+
+def class_time(class_schedule):
+    return f"{hhmm(class_schedule.start_time)} - {hhmm(class_schedule.end_time)}"
+
+
+class Schema:
+    """`fields` maps each output key to 'attr' / 'rel.attr' or ('attr', formatter)."""
+
+    def __init__(self, **fields):
+        self.fields = fields
+        namespace = {}
+        items = []
+        for i, (key, spec) in enumerate(fields.items()):
+            path, formatter = spec if isinstance(spec, tuple) else (spec, None)
+            if not all(part.isidentifier() for part in path.split('.')):
+                raise ValueError(f"Invalid attribute path {path!r}")
+            expression = f"obj.{path}"
+            if formatter is not None:
+                namespace[f"f{i}"] = formatter
+                expression = f"f{i}({expression})"
+            items.append(f"{key!r}: {expression}")
+        source = f"def dump(obj):\n    return {{{', '.join(items)}}}\n"
+        exec(compile(source, f"<schema {', '.join(fields)}>", 'exec'), namespace)
+        self.dump = namespace['dump']
+
+    def dump_many(self, objs):
+        dump = self.dump
+        return [dump(obj) for obj in objs]
+
+
+INSTITUTION = Schema(id='id', name='name')
+BRANCH = Schema(id='id', name='name', institution_id='institution_id')
+SEMESTER = Schema(id='id', number='number', branch_id='branch_id')
+SUBJECT = Schema(id='id', name='name', course_code='course_code', semester_id='semester_id')
+CLASS_SCHEDULE = Schema(id='id', subject_id='subject_id', teacher_id='teacher_id', room='room',
+                        day_of_week='day_of_week', start_time=('start_time', hhmm), end_time=('end_time', hhmm))
+ROSTER_STUDENT = Schema(id='id', name='name', college_id='college_id')
+TODAYS_ATTENDANCE = Schema(student_name='student.name', college_id='student.college_id', status='status')
+CLASS_ATTENDANCE = Schema(student_id='student_id', student_name='student.name',
+                          college_id='student.college_id', status='status')
+ATTENDANCE_HISTORY = Schema(date=('date', iso_date), subject=('class_schedule.subject', subject_label),
+                            status='status', class_time=('class_schedule', class_time))
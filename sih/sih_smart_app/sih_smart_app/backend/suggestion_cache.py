@@ -0,0 +1,153 @@
+# File: backend/suggestion_cache.py
+"""
+Cache for AI-generated study suggestions.
+
+Entries are keyed by student, date and a hash of the prompt inputs, expire
+after a TTL and are evicted least-recently-used. A small in-process LRU sits
+in front of a SQLite file so repeat dashboard loads skip the LLM entirely and
+cached advice survives restarts and is shared between workers. Hits served
+from memory still count as uses: their access times are written to SQLite
+in one batch at most every `touch_interval` seconds and before each sweep,
+so a hot entry is not evicted as if it had gone unread.
+
+tests/test_suggestion_cache.py checks hits, misses, invalidation and
+restarts against a fake generator; bench_suggestion_cache.py times them.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS suggestions (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_suggestions_accessed_at ON suggestions (accessed_at);
+"""
+
+# Expired and least-recently-used rows are swept every EVICT_INTERVAL writes
+EVICT_INTERVAL = 100
+# Default seconds between writes of the access times of in-memory hits
+TOUCH_INTERVAL = 30.0
+
+
+def attendance_bucket(attendance_data, width=5):
+    """Coarse attendance summary: overall percentage in `width`-point steps plus
+    the subjects under 75%. Small day-to-day changes keep the same bucket."""
+    overall = int(attendance_data.get("overall_percentage", 0) // width) * width
+    low = sorted(s for s, stats in attendance_data.get("subject_stats", {}).items() if stats["percentage"] < 75)
+    return {"overall": overall, "below_75": low}
+
+
+def suggestion_key(user, day, attendance_data):
+    inputs = json.dumps([
+        user.career_goal, user.weak_subjects, user.interests, attendance_bucket(attendance_data)
+    ], sort_keys=True)
+    digest = hashlib.sha256(inputs.encode('utf-8')).hexdigest()[:16]
+    return f"{user.id}:{day.isoformat()}:{digest}"
+
+
+class SuggestionCache:
+    def __init__(self, path, ttl=24 * 3600, max_entries=10000, touch_interval=TOUCH_INTERVAL):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self._touched = {}
+        self._touched_at = time.time()
+
+    @property
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._memory[key] = (value, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None and hit[1] <= now:
+                del self._memory[key]
+                hit = None
+            if hit is not None:
+                self._memory.move_to_end(key)
+                self._touched[key] = now
+                due = now - self._touched_at >= self.touch_interval
+        if hit is not None:
+            if due:
+                self._touch(now)
+            return hit[0]
+        row = self._conn.execute(
+            "UPDATE suggestions SET accessed_at = ? WHERE key = ? AND expires_at > ? RETURNING value, expires_at",
+            (now, key, now),
+        ).fetchone()
+        if row is None:
+            return None
+        self._remember(key, row[0], row[1])
+        return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl
+        conn = self._conn
+        conn.execute(
+            "INSERT OR REPLACE INTO suggestions (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, value, expires_at, now),
+        )
+        self._remember(key, value, expires_at)
+        self._writes += 1
+        if self._writes % EVICT_INTERVAL == 0:
+            self._touch(now)
+            self._evict(conn, now)
+
+    def _touch(self, now):
+        """Write the access times of the memory hits since the last call to SQLite."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._touched_at = now
+        if not touched:
+            return
+        conn = self._conn
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany("UPDATE suggestions SET accessed_at = ? WHERE key = ? AND accessed_at < ?",
+                             [(at, key, at) for key, at in touched.items()])
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM suggestions WHERE expires_at <= ?", (now,))
+        # Least recently used rows beyond max_entries
+        conn.execute(
+            "DELETE FROM suggestions WHERE key IN ("
+            "SELECT key FROM suggestions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+        self._conn.execute("DELETE FROM suggestions")
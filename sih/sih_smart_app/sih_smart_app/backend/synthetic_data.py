@@ -0,0 +1,223 @@
+# File: backend/synthetic_data.py
+"""
+Deterministic synthetic dataset generator for development and load testing.
+
+Builds institutions, branches, semesters, subjects, teachers, a clash-free
+weekly timetable, students with enrollments and profiles, and `weeks` of
+AttendanceRecord history up to `today`. Everything derives from `seed`, so
+two runs with the same arguments produce identical rows.
+
+Rows are written with bulk Core inserts inside one transaction and ids are
+assigned up front, so tens of thousands of students and millions of
+attendance records load in seconds. All users of a role share one password
+hash, computed once; do not use generated data outside development.
+"""
+import random
+from itertools import repeat
+import time as _time
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+from sqlalchemy import bindparam, func, insert, update
+
+from attendance_index import rebuild as rebuild_attendance_index
+from auth import hash_password
+from models import db, enrollments, AttendanceRecord, Branch, ClassSchedule, Institution, Semester, Subject, User
+
+BRANCHES = [
+    ("Computer Science", "CS"), ("Electronics & Communication", "EC"), ("Mechanical Engineering", "ME"),
+    ("Civil Engineering", "CE"), ("Electrical Engineering", "EE"), ("Information Technology", "IT"),
+]
+SUBJECT_STEMS = [
+    "Mathematics", "Data Structures", "Operating Systems", "Databases", "Computer Networks",
+    "Signals and Systems", "Thermodynamics", "Machine Learning", "Control Systems", "Software Engineering",
+    "Digital Logic", "Fluid Mechanics", "Web Technologies", "Cyber Security", "Engineering Drawing",
+]
+FIRST_NAMES = ["Aarav", "Diya", "Rohan", "Ananya", "Vikram", "Sneha", "Karthik", "Priya", "Arjun", "Meera",
+               "Rahul", "Kavya", "Siddharth", "Lakshmi", "Nikhil", "Divya", "Harsha", "Pooja", "Ravi", "Sanjana"]
+LAST_NAMES = ["Raju", "Sharma", "Reddy", "Iyer", "Naidu", "Varma", "Rao", "Patel", "Menon", "Gupta"]
+CAREER_GOALS = ["Software Developer", "Data Scientist", "Cyber Security Specialist", "Embedded Engineer",
+                "Civil Services", "Researcher", "Product Manager"]
+INTERESTS = ["Web Development, AI", "Machine Learning, Statistics", "Ethical Hacking, Networks",
+             "Robotics, IoT", "Competitive Programming", "Design, UX"]
+# Hourly teaching slots (13:00 is lunch), Monday to Saturday
+TEACHING_HOURS = [9, 10, 11, 12, 14, 15, 16, 17]
+TEACHING_DAYS = range(6)
+CHUNK_SIZE = 50000
+
+DEMO_PASSWORDS = {'admin': 'Admin@123', 'teacher': 'Teacher@123', 'student': 'Student@123'}
+
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _bulk_insert(table, rows):
+    # executemany takes its column list from the first row, so every row needs every key
+    keys = set().union(*rows) if rows else set()
+    rows = [{key: row.get(key) for key in keys} for row in rows]
+    for i in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(insert(table), rows[i:i + CHUNK_SIZE])
+
+
+def _bulk_insert_tuples(table, columns, rows):
+    # Millions of rows: skip per-row dict processing and hand tuples straight to the driver
+    placeholder = {'qmark': '?', 'numeric': ':{}'}.get(db.engine.dialect.paramstyle, '%s')
+    values = ", ".join(placeholder.format(i + 1) for i in range(len(columns)))
+    sql = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({values})"
+    connection = db.session.connection()
+    for i in range(0, len(rows), CHUNK_SIZE):
+        connection.exec_driver_sql(sql, rows[i:i + CHUNK_SIZE])
+
+
+def generate_dataset(seed=42, institutions=1, branches=3, semesters=8, subjects_per_semester=5,
+                     students=300, teachers_per_branch=8, classes_per_subject=3, weeks=16,
+                     today=None, log=print):
+    """Insert a synthetic dataset and return a dict of row counts per table."""
+    started = _time.perf_counter()
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    today = today or date.today()
+    term_start = today - timedelta(weeks=weeks)
+    hashes = {role: hash_password(password) for role, password in DEMO_PASSWORDS.items()}
+
+    inst_id, branch_id, sem_id = _next_id(Institution), _next_id(Branch), _next_id(Semester)
+    subject_id, user_id, class_id = _next_id(Subject), _next_id(User), _next_id(ClassSchedule)
+
+    inst_rows, branch_rows, sem_rows, subject_rows, user_rows = [], [], [], [], []
+    class_rows, enrollment_rows = [], []
+    semester_classes = {}   # semester id -> [(class id, day_of_week, start hour)]
+    semester_students = {}  # semester id -> [student ids]
+    admin_for_inst = {}
+
+    def person_name():
+        return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+    students_per_semester = max(1, students // max(1, institutions * branches * semesters))
+    for i in range(institutions):
+        this_inst = inst_id + i
+        inst_rows.append({"id": this_inst, "name": f"Synthetic Institute of Technology {seed}-{i + 1}"})
+        admin_for_inst[this_inst] = user_id
+        user_rows.append({"id": user_id, "college_id": f"ADMIN{seed}I{i + 1}", "password": hashes['admin'],
+                          "name": person_name(), "role": 'admin', "institution_id": this_inst})
+        user_id += 1
+
+        for b in range(branches):
+            branch_name, code = BRANCHES[b % len(BRANCHES)]
+            this_branch = branch_id
+            branch_id += 1
+            branch_rows.append({"id": this_branch, "name": branch_name, "institution_id": this_inst})
+
+            teachers = []
+            for t in range(teachers_per_branch):
+                teachers.append(user_id)
+                user_rows.append({"id": user_id, "college_id": f"T{seed}I{i + 1}{code}{t + 1:03d}",
+                                  "password": hashes['teacher'], "name": "Dr. " + person_name(), "role": 'teacher',
+                                  "institution_id": this_inst, "designation": rng.choice(["Professor", "Associate Professor", "Assistant Professor"]),
+                                  "email": f"t{user_id}@example.edu"})
+                user_id += 1
+            teacher_busy = set()
+
+            for number in range(1, semesters + 1):
+                this_sem = sem_id
+                sem_id += 1
+                sem_rows.append({"id": this_sem, "number": number, "branch_id": this_branch})
+                room = f"{code}-{100 * number + b}"
+                free = [(d, h) for d in TEACHING_DAYS for h in TEACHING_HOURS]
+                rng.shuffle(free)
+                semester_classes[this_sem] = []
+                subject_names = rng.sample(SUBJECT_STEMS, min(subjects_per_semester, len(SUBJECT_STEMS)))
+
+                for s, stem in enumerate(subject_names):
+                    subject_rows.append({"id": subject_id, "name": stem,
+                                         "course_code": f"{code}{number}{s + 1:02d}", "semester_id": this_sem})
+                    teacher = teachers[(number * subjects_per_semester + s) % len(teachers)]
+                    placed = 0
+                    for slot in list(free):
+                        if placed == classes_per_subject:
+                            break
+                        if (teacher, slot) in teacher_busy:
+                            continue
+                        free.remove(slot)
+                        teacher_busy.add((teacher, slot))
+                        day, hour = slot
+                        class_rows.append({"id": class_id, "subject_id": subject_id, "teacher_id": teacher,
+                                           "room": room, "day_of_week": day,
+                                           "start_time": time(hour, 0), "end_time": time(hour + 1, 0)})
+                        semester_classes[this_sem].append((class_id, day, hour))
+                        class_id += 1
+                        placed += 1
+                    subject_id += 1
+
+                semester_students[this_sem] = []
+                for n in range(students_per_semester):
+                    user_rows.append({"id": user_id, "college_id": f"S{seed}I{i + 1}{code}{number}{n + 1:05d}",
+                                      "password": hashes['student'], "name": person_name(), "role": 'student',
+                                      "institution_id": this_inst, "branch_id": this_branch,
+                                      "current_semester_id": this_sem, "email": f"s{user_id}@example.edu",
+                                      "career_goal": rng.choice(CAREER_GOALS), "interests": rng.choice(INTERESTS),
+                                      "weak_subjects": rng.choice(subject_names)})
+                    enrollment_rows.append({"user_id": user_id, "semester_id": this_sem})
+                    semester_students[this_sem].append(user_id)
+                    user_id += 1
+
+    # Attendance: one row per student per class occurrence since term_start.
+    # Each student has a fixed attendance propensity so some fall below 75%.
+    record_rows = []
+    statuses = np.array(["absent", "present"], dtype=object)
+    # Only a few hundred distinct dates/timestamps: convert them to the driver's
+    # representation once instead of once per row
+    dialect = db.engine.dialect
+    columns = AttendanceRecord.__table__.c
+    as_date = columns.date.type.dialect_impl(dialect).bind_processor(dialect) or (lambda v: v)
+    as_timestamp = columns.timestamp.type.dialect_impl(dialect).bind_processor(dialect) or (lambda v: v)
+    for sem, classes in semester_classes.items():
+        student_ids = semester_students[sem]
+        if not student_ids or not classes:
+            continue
+        p = np_rng.beta(8, 2, size=len(student_ids))
+        for cid, day, hour in classes:
+            first = term_start + timedelta(days=(day - term_start.weekday()) % 7)
+            dates = []
+            while first < today:
+                dates.append(first)
+                first += timedelta(weeks=1)
+            present = np_rng.random((len(dates), len(student_ids))) < p
+            for class_date, row in zip(dates, statuses[present.astype(np.int8)].tolist()):
+                stamp = as_timestamp(datetime.combine(class_date, time(hour, 5)))
+                record_rows.extend(zip(student_ids, repeat(cid), repeat(as_date(class_date)), row, repeat(stamp)))
+
+    _bulk_insert(Institution.__table__, inst_rows)
+    _bulk_insert(Branch.__table__, branch_rows)
+    _bulk_insert(Semester.__table__, sem_rows)
+    _bulk_insert(Subject.__table__, subject_rows)
+    _bulk_insert(User.__table__, user_rows)
+    # Institution.admin_id can only point at the admin once the users exist
+    institutions_table = Institution.__table__
+    db.session.execute(
+        update(institutions_table).where(institutions_table.c.id == bindparam('inst_id')).values(admin_id=bindparam('admin')),
+        [{"inst_id": inst, "admin": admin} for inst, admin in admin_for_inst.items()]
+    )
+    _bulk_insert(enrollments, enrollment_rows)
+    _bulk_insert(ClassSchedule.__table__, class_rows)
+    _bulk_insert_tuples(AttendanceRecord.__table__, ["student_id", "class_id", "date", "status", "timestamp"], record_rows)
+    # Records went in behind the write paths, so fill the at-risk counters from them
+    rebuild_attendance_index()
+    db.session.commit()
+
+    counts = {
+        "institutions": len(inst_rows), "branches": len(branch_rows), "semesters": len(sem_rows),
+        "subjects": len(subject_rows), "users": len(user_rows), "class_schedules": len(class_rows),
+        "attendance_records": len(record_rows),
+    }
+    log(f"Generated {counts} in {_time.perf_counter() - started:.1f}s (seed={seed})")
+    return counts
+
+
+def print_demo_logins(log=print):
+    """Print one login per role from the generated data."""
+    log("\n🔐 Login Credentials:")
+    for role, password in DEMO_PASSWORDS.items():
+        user = User.query.filter_by(role=role).order_by(User.id).first()
+        if user:
+            log(f"  • {role.title()}: College ID {user.college_id} / Password {password}")
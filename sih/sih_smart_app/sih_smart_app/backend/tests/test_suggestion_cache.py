@@ -0,0 +1,135 @@
+"""
+Hits, misses, invalidation and restarts of the AI suggestion cache.
+
+Each load goes the way get_smart_routine does: look the key up, and on a
+miss generate in the background through AIClient and store the text. A
+fake generator stands in for the LLM and counts the calls.
+
+    python -m pytest tests
+"""
+import sqlite3
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from ai_client import AIClient
+from suggestion_cache import SuggestionCache, suggestion_key
+
+TODAY = date(2024, 9, 2)
+
+
+class FakeGenerator:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, prompt):
+        self.calls += 1
+        return f"1. Suggestion {self.calls}."
+
+
+def attendance(overall, low=()):
+    return {"overall_percentage": overall,
+            "subject_stats": {subject: {"percentage": 60.0} for subject in low}}
+
+
+def student(**changes):
+    fields = dict(id=1, career_goal="Data Scientist", weak_subjects="Databases", interests="AI")
+    return SimpleNamespace(**dict(fields, **changes))
+
+
+@pytest.fixture
+def generator():
+    return FakeGenerator()
+
+
+@pytest.fixture
+def client(generator):
+    return AIClient(generator=generator)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'suggestions.db')
+
+
+def load(cache, client, user, day, attendance_data, wait=2.0):
+    """(text, hit) for one dashboard load; a miss waits for the background generation."""
+    key = suggestion_key(user, day, attendance_data)
+    text = cache.get(key)
+    if text is not None:
+        return text, True
+    client.generate_async(key, "prompt", lambda generated: cache.set(key, generated))
+    deadline = time.monotonic() + wait
+    while text is None and time.monotonic() < deadline:
+        time.sleep(0.005)
+        text = cache.get(key)
+    return text, False
+
+
+def test_first_load_misses_and_repeat_load_hits(path, client, generator):
+    cache = SuggestionCache(path)
+    assert load(cache, client, student(), TODAY, attendance(82.0)) == ("1. Suggestion 1.", False)
+    assert load(cache, client, student(), TODAY, attendance(82.0)) == ("1. Suggestion 1.", True)
+    assert generator.calls == 1
+
+
+def test_attendance_change_within_bucket_hits(path, client, generator):
+    cache = SuggestionCache(path)
+    load(cache, client, student(), TODAY, attendance(82.0))
+    assert load(cache, client, student(), TODAY, attendance(83.0)) == ("1. Suggestion 1.", True)
+    assert generator.calls == 1
+
+
+@pytest.mark.parametrize("user, day, attendance_data", [
+    (student(weak_subjects="Networks"), TODAY, attendance(82.0)),
+    (student(career_goal="Web Developer"), TODAY, attendance(82.0)),
+    (student(), TODAY, attendance(72.0, ["Databases (CS101)"])),
+    (student(), TODAY + timedelta(days=1), attendance(82.0)),
+    (student(id=2), TODAY, attendance(82.0)),
+])
+def test_changed_prompt_inputs_miss(path, client, generator, user, day, attendance_data):
+    cache = SuggestionCache(path)
+    load(cache, client, student(), TODAY, attendance(82.0))
+    assert load(cache, client, user, day, attendance_data) == ("1. Suggestion 2.", False)
+    assert generator.calls == 2
+
+
+def test_restarted_cache_hits_without_generating(path, client, generator):
+    load(SuggestionCache(path), client, student(), TODAY, attendance(82.0))
+    restarted = SuggestionCache(path)
+    assert load(restarted, client, student(), TODAY, attendance(82.0)) == ("1. Suggestion 1.", True)
+    assert generator.calls == 1
+
+
+def test_expired_entries_miss(path):
+    cache = SuggestionCache(path, ttl=0)
+    key = suggestion_key(student(), TODAY, attendance(82.0))
+    cache.set(key, "1. Stale.")
+    assert cache.get(key) is None
+    assert SuggestionCache(path).get(key) is None
+
+
+def test_clear_drops_memory_and_file(path):
+    cache = SuggestionCache(path)
+    key = suggestion_key(student(), TODAY, attendance(82.0))
+    cache.set(key, "1. Cleared.")
+    cache.clear()
+    assert cache.get(key) is None
+    assert SuggestionCache(path).get(key) is None
+
+
+def test_memory_hits_refresh_access_time_in_file(path):
+    cache = SuggestionCache(path, touch_interval=0)
+    key = suggestion_key(student(), TODAY, attendance(82.0))
+    cache.set(key, "1. Hot.")
+
+    def accessed_at():
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT accessed_at FROM suggestions WHERE key = ?", (key,)).fetchone()[0]
+
+    before = accessed_at()
+    time.sleep(0.01)
+    assert cache.get(key) == "1. Hot."
+    assert accessed_at() > before
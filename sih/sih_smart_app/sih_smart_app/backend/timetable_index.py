@@ -0,0 +1,132 @@
+# File: backend/timetable_index.py
+"""
+Minute-resolution timetable bitmaps for free/busy queries.
+
+All ClassSchedule rows are loaded once into NumPy arrays. For each weekday
+and entity kind (semester, teacher, room) a boolean matrix of shape
+(entities, 1440) marks busy minutes; it is built on first use with a
+cumulative-sum fill, so overlapping classes are handled correctly. Free-slot
+and availability queries are then array reductions over the matrix.
+Room names are only unique within an institution, so rooms are keyed by
+(institution_id, room), the institution being that of the class's teacher.
+
+The index is cached per process for INDEX_TTL seconds and dropped
+immediately by invalidate() when this process changes the timetable.
+"""
+import threading
+import time as _time
+from datetime import time
+
+import numpy as np
+
+from models import ClassSchedule, Subject, User
+
+MINUTES_PER_DAY = 24 * 60
+INDEX_TTL = 60.0
+
+
+def to_minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def from_minutes(m):
+    return time(int(m) // 60, int(m) % 60)
+
+
+def _object_array(values):
+    # 1-D even when the values are tuples, which np.array would turn into a second axis
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+
+class TimetableIndex:
+    def __init__(self, rows):
+        # rows: (semester_id, teacher_id, institution_id, room, day_of_week, start_time, end_time)
+        self.keys = {
+            'semester': np.array([r[0] for r in rows], dtype=object),
+            'teacher': np.array([r[1] for r in rows], dtype=object),
+            'room': _object_array([(r[2], r[3]) if r[3] is not None else None for r in rows]),
+        }
+        self.day = np.array([r[4] for r in rows], dtype=np.int8)
+        self.start = np.array([to_minutes(r[5]) for r in rows], dtype=np.int16)
+        self.end = np.array([to_minutes(r[6]) for r in rows], dtype=np.int16)
+        self._matrices = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls):
+        rows = (ClassSchedule.query.join(Subject).join(User, ClassSchedule.teacher_id == User.id)
+                .with_entities(Subject.semester_id, ClassSchedule.teacher_id, User.institution_id, ClassSchedule.room,
+                               ClassSchedule.day_of_week, ClassSchedule.start_time, ClassSchedule.end_time)
+                .all())
+        return cls(rows)
+
+    def _matrix(self, kind, day):
+        cache_key = (kind, day)
+        cached = self._matrices.get(cache_key)
+        if cached is not None:
+            return cached
+        mask = (self.day == day) & np.array([k is not None for k in self.keys[kind]], dtype=bool)
+        entity_keys = self.keys[kind][mask]
+        keys = list(dict.fromkeys(entity_keys.tolist()))
+        position = {k: i for i, k in enumerate(keys)}
+        rows = np.array([position[k] for k in entity_keys], dtype=np.int64)
+        # +1 at each start minute, -1 at each end minute; a positive running sum means busy
+        diff = np.zeros((len(keys), MINUTES_PER_DAY + 1), dtype=np.int16)
+        np.add.at(diff, (rows, self.start[mask].astype(np.int64)), 1)
+        np.add.at(diff, (rows, self.end[mask].astype(np.int64)), -1)
+        busy = np.cumsum(diff, axis=1)[:, :MINUTES_PER_DAY] > 0
+        with self._lock:
+            self._matrices[cache_key] = (position, busy)
+        return position, busy
+
+    def busy(self, kind, key, day):
+        """Boolean array of length 1440 marking the minutes `key` is in class."""
+        position, matrix = self._matrix(kind, day)
+        if key not in position:
+            return np.zeros(MINUTES_PER_DAY, dtype=bool)
+        return matrix[position[key]]
+
+    def free_slots(self, kind, key, day, day_start=9 * 60, day_end=18 * 60, slot_minutes=60):
+        """Start times of the slots in [day_start, day_end) with no class at all."""
+        window = self.busy(kind, key, day)[day_start:day_end]
+        slot_busy = window.reshape(-1, slot_minutes).any(axis=1)
+        starts = np.arange(day_start, day_end, slot_minutes)[~slot_busy]
+        return [from_minutes(m) for m in starts]
+
+    def rooms(self, institution_id):
+        """(institution_id, room) keys of the rooms in the institution's timetable."""
+        return sorted({k for k in self.keys['room'].tolist() if k is not None and k[0] == institution_id},
+                      key=lambda k: str(k[1]))
+
+    def available(self, kind, day, start, end, candidates=None):
+        """Keys of `kind` with no class overlapping [start, end) minutes on `day`.
+        `candidates` defaults to every key that appears in the timetable."""
+        position, matrix = self._matrix(kind, day)
+        if candidates is None:
+            candidates = sorted({k for k in self.keys[kind].tolist() if k is not None}, key=str)
+        busy_keys = set()
+        if position:
+            overlapping = matrix[:, start:end].any(axis=1)
+            busy_keys = {k for k, i in position.items() if overlapping[i]}
+        return [k for k in candidates if k not in busy_keys]
+
+
+_cache = {'index': None, 'loaded_at': 0.0}
+_cache_lock = threading.Lock()
+
+
+def timetable_index():
+    with _cache_lock:
+        index = _cache['index']
+        if index is None or _time.monotonic() - _cache['loaded_at'] > INDEX_TTL:
+            index = TimetableIndex.load()
+            _cache['index'], _cache['loaded_at'] = index, _time.monotonic()
+        return index
+
+
+def invalidate():
+    with _cache_lock:
+        _cache['index'] = None
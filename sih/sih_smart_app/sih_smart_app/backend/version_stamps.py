@@ -0,0 +1,75 @@
+# File: backend/version_stamps.py
+"""
+Version stamps and ETags for read-heavy GET endpoints.
+
+A cacheable response depends on a few stamp keys such as 'teacher:7',
+'class:12' or 'student:42'. Write paths call bump() for the keys they
+affect inside their own transaction, so the stamp changes exactly when the
+data does. The @conditional decorator hashes the current versions into an
+ETag with one primary-key lookup and answers If-None-Match with 304 before
+the view runs its real queries. Stamps live in the main database, so every
+worker agrees on them.
+"""
+import hashlib
+from functools import wraps
+
+from flask import current_app, make_response, request
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, ClassSchedule, Subject, VersionStamp
+
+
+def bump(*keys):
+    """Increment the stamps for `keys` in the current session; the caller commits."""
+    keys = {key for key in keys if key}
+    if not keys:
+        return
+    table = VersionStamp.__table__
+    increment = update(table).where(table.c.key.in_(keys)).values(version=table.c.version + 1)
+    if db.session.execute(increment).rowcount == len(keys):
+        return
+    existing = set(db.session.execute(select(table.c.key).where(table.c.key.in_(keys))).scalars())
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(table), [{"key": key, "version": 1} for key in keys - existing])
+    except IntegrityError:
+        # A concurrent writer created some of them first; count our change on top
+        db.session.execute(increment)
+
+
+def semester_class_keys(semester_id):
+    # Rosters are cached per class, so an enrollment change touches every class of the semester
+    class_ids = (db.session.query(ClassSchedule.id).join(Subject)
+                 .filter(Subject.semester_id == semester_id).all())
+    return [f"class:{class_id}" for (class_id,) in class_ids]
+
+
+def etag_for(*keys, extra=""):
+    """Hash of the current versions of `keys` (missing keys count as version 0)."""
+    table = VersionStamp.__table__
+    versions = dict(db.session.execute(select(table.c.key, table.c.version).where(table.c.key.in_(keys))).all())
+    state = "|".join(f"{key}={versions.get(key, 0)}" for key in sorted(keys)) + "|" + extra
+    return hashlib.sha1(state.encode()).hexdigest()[:20]
+
+
+def conditional(etag_func):
+    """Decorator for GET views. `etag_func` gets the view's URL arguments and
+    returns the ETag; a matching If-None-Match short-circuits with 304."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = etag_func(**kwargs)
+            # Weak comparison: compressed responses carry W/ tags (see fast_json.py)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            # Clients may keep the body but must revalidate before using it
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
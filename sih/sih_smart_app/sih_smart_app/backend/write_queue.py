@@ -0,0 +1,164 @@
+# File: backend/write_queue.py
+"""
+Group-commit write queue for SQLite.
+
+SQLite allows one writer at a time. When every request commits its own
+transaction, a burst of attendance saves queues on the database lock, and
+a request whose deferred transaction has already read cannot upgrade to a
+write lock once another writer holds it: it fails with "database is
+locked" at once, whatever the busy timeout.
+
+With WRITE_QUEUE_ENABLED, handlers hand their write to submit() and wait
+on the returned future while one writer thread per process runs the
+queued jobs. Each round takes everything queued (up to
+WRITE_QUEUE_MAX_BATCH jobs) and runs it in a single BEGIN IMMEDIATE
+transaction, so N requests cost one lock acquisition and one fsync
+instead of N. Every job runs in its own savepoint; a job that raises is
+rolled back alone and its future gets the exception. Jobs run in the
+writer's session, so they take and return ids and plain values rather
+than ORM objects of the handler's session. Slow work (image decoding,
+embedding, reading what is already stored) stays in the handler, outside
+the transaction.
+
+A job marked with @batched is called once per round with the arguments
+of all its queued calls and returns one result per call, so the round's
+attendance saves become one insert, one update and one counter update
+instead of a few statements per save. If that call raises, each queued
+call is retried alone in its own savepoint, and only the ones that fail
+again get the exception.
+
+The queue also switches the database to WAL, so readers no longer wait
+for the writer.
+
+Measured with bench_write_queue.py (16 threads x 20 saves of 30 marks),
+the queue committed 210-310 saves/s against 90-110 with every save
+committing its own transaction (110-130 with WAL on there too), and p99
+fell from about 1.4 s to under 0.1 s. The median save rose from about
+10 ms to 60-75 ms, because every save waits for the round it joined.
+
+run() gives up after its timeout only if the writer has not started the
+job: the job is cancelled, so TimeoutError means the write was not made.
+A job already in the open transaction is waited for instead.
+"""
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from sqlalchemy import text
+
+from models import db
+
+
+def batched(job):
+    """Mark `job` as taking a list of argument tuples, one per queued call, and
+    returning a list with one result per call."""
+    job.batched = True
+    return job
+
+
+def run_inline(job, *args):
+    """Run `job(*args)` in the current session, batched or not."""
+    if getattr(job, 'batched', False):
+        return job([args])[0]
+    return job(*args)
+
+
+class WriteQueue:
+    def __init__(self, app, max_batch=64):
+        self.app = app
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        # One writer thread per process; a forked gunicorn worker starts its own
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            with self.app.app_context():
+                self.sqlite = db.engine.dialect.name == 'sqlite'
+                if self.sqlite:
+                    with db.engine.connect() as conn:
+                        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+            self._queue = queue.Queue()
+            threading.Thread(target=self._run, name='write-queue', daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, job, *args):
+        """Queue `job(*args)` for the next group commit; the future resolves
+        to its return value once the transaction holding it has committed."""
+        self._start()
+        future = Future()
+        self._queue.put((future, job, args))
+        return future
+
+    def run(self, job, *args, timeout=None):
+        """submit() and wait. Raises TimeoutError, with the job cancelled and nothing
+        written, if the writer has not started it within `timeout` seconds."""
+        future = self.submit(job, *args)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            # _commit skips cancelled jobs; one already running is about to commit
+            if future.cancel():
+                raise
+            return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Whatever queued up while the previous transaction committed joins this one
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self.app.app_context():
+                self._commit(batch)
+
+    def _commit(self, batch):
+        outcomes = []
+        try:
+            if self.sqlite:
+                # Take the write lock up front: a deferred transaction cannot wait for it later
+                db.session.execute(text("BEGIN IMMEDIATE"))
+            groups = {}
+            for future, job, args in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if getattr(job, 'batched', False):
+                    groups.setdefault(job, []).append((future, args))
+                else:
+                    outcomes.append(self._apply(future, job, *args))
+            for job, calls in groups.items():
+                try:
+                    with db.session.begin_nested():
+                        results = job([args for _, args in calls])
+                    outcomes.extend((future, result, None) for (future, _), result in zip(calls, results))
+                except Exception:
+                    # Find the calls that fail on their own; the others still commit
+                    outcomes.extend(self._apply(future, run_inline, job, *args) for future, args in calls)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            for future, _, _ in batch:
+                if future.running():
+                    future.set_exception(e)
+            return
+        finally:
+            db.session.remove()
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    @staticmethod
+    def _apply(future, job, *args):
+        try:
+            with db.session.begin_nested():
+                return future, job(*args), None
+        except Exception as e:
+            return future, None, e
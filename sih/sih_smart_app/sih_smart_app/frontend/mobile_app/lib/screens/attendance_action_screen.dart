@@ -42,12 +42,12 @@ class _AttendanceActionScreenState extends State<AttendanceActionScreen> {
       final result = await ApiService.markAttendance(_image!);
       if (!mounted) return;
       if (result['success']) {
-        final List<String> presentList = List<String>.from(result['data']['present']);
+        final List<int> presentIds = List<int>.from(result['data']['present_ids']);
         Navigator.pushReplacement(
           context,
           MaterialPageRoute(
             builder: (context) => AttendanceResultScreen(
-              presentStudentsByAI: presentList,
+              presentStudentIds: presentIds,
               classSchedule: widget.classSchedule,
             ),
           ),
@@ -4,12 +4,12 @@ import 'package:mobile_app/components/custom_loading_indicator.dart';
 import 'package:mobile_app/services/api_service.dart';
 
 class AttendanceResultScreen extends StatefulWidget {
-  final List<String> presentStudentsByAI;
+  final List<int> presentStudentIds;
   final Map<String, dynamic> classSchedule;
 
   const AttendanceResultScreen({
     super.key,
-    required this.presentStudentsByAI,
+    required this.presentStudentIds,
     required this.classSchedule,
   });
 
@@ -19,7 +19,7 @@ class AttendanceResultScreen extends StatefulWidget {
 
 class _AttendanceResultScreenState extends State<AttendanceResultScreen> {
   late Future<List<dynamic>> _classRosterFuture;
-  Map<String, bool> attendanceStatus = {};
+  Map<int, bool> attendanceStatus = {};
   bool _isSaving = false;
 
   @override
@@ -32,8 +32,8 @@ class _AttendanceResultScreenState extends State<AttendanceResultScreen> {
   Future<List<dynamic>> _loadClassRosterAndSetStatus(int classId) async {
     final classRoster = await ApiService.getClassRoster(classId);
     for (var student in classRoster) {
-      final studentName = student['name'] as String;
-      attendanceStatus[studentName] = widget.presentStudentsByAI.contains(studentName);
+      final studentId = student['id'] as int;
+      attendanceStatus[studentId] = widget.presentStudentIds.contains(studentId);
     }
     return classRoster;
   }
@@ -98,15 +98,16 @@ class _AttendanceResultScreenState extends State<AttendanceResultScreen> {
                   itemCount: classRoster.length,
                   itemBuilder: (context, index) {
                     final student = classRoster[index];
+                    final studentId = student['id'] as int;
                     final studentName = student['name'] as String;
                     return Card(
                       child: SwitchListTile(
                         title: Text(studentName, style: const TextStyle(fontWeight: FontWeight.w500)),
                         subtitle: Text(student['college_id'] ?? 'N/A'),
-                        value: attendanceStatus[studentName] ?? false,
+                        value: attendanceStatus[studentId] ?? false,
                         onChanged: (bool newValue) {
                           setState(() {
-                            attendanceStatus[studentName] = newValue;
+                            attendanceStatus[studentId] = newValue;
                           });
                         },
                       ),
@@ -7,6 +7,17 @@ import 'package:image_picker/image_picker.dart';
 class ApiService {
   static const String _baseUrl = "http://10.0.2.2:5000/api";
 
+  // Every endpoint after login needs the token saved by login()
+  static Future<Map<String, String>> _authHeaders({bool json = false}) async {
+    final prefs = await SharedPreferences.getInstance();
+    final token = prefs.getString('auth_token');
+    if (token == null) throw Exception('User not logged in');
+    return <String, String>{
+      'Authorization': 'Bearer $token',
+      if (json) 'Content-Type': 'application/json; charset=UTF-8',
+    };
+  }
+
   static Future<Map<String, dynamic>> registerInstitution(Map<String, String> data) async {
     try {
       final response = await http.post(
@@ -37,6 +48,7 @@ class ApiService {
         final prefs = await SharedPreferences.getInstance();
         await prefs.setString('user_role', data['role']);
         await prefs.setInt('user_id', data['user_id']);
+        await prefs.setString('auth_token', data['token']);
         return {'success': true, 'data': data};
       } else {
         return {'success': false, 'message': 'Failed to login'};
@@ -54,7 +66,7 @@ class ApiService {
 
       final response = await http.post(
         Uri.parse('$_baseUrl/student/$userId/profile'),
-        headers: <String, String>{'Content-Type': 'application/json; charset=UTF-8'},
+        headers: await _authHeaders(json: true),
         body: jsonEncode(profileData),
       );
       if (response.statusCode == 200) {
@@ -73,7 +85,7 @@ class ApiService {
       final userId = prefs.getInt('user_id');
       if (userId == null) throw Exception('User not logged in');
       
-      final response = await http.get(Uri.parse('$_baseUrl/student/$userId/smart_routine'));
+      final response = await http.get(Uri.parse('$_baseUrl/student/$userId/smart_routine'), headers: await _authHeaders());
 
       if (response.statusCode == 200) {
         return jsonDecode(response.body);
@@ -90,7 +102,7 @@ class ApiService {
       final prefs = await SharedPreferences.getInstance();
       final userId = prefs.getInt('user_id');
       if (userId == null) throw Exception('User not logged in');
-      final response = await http.get(Uri.parse('$_baseUrl/teacher/$userId/timetable/today'));
+      final response = await http.get(Uri.parse('$_baseUrl/teacher/$userId/timetable/today'), headers: await _authHeaders());
       if (response.statusCode == 200) {
         return jsonDecode(response.body);
       } else {
@@ -103,7 +115,7 @@ class ApiService {
   
   static Future<List<dynamic>> getClassRoster(int classId) async {
     try {
-      final response = await http.get(Uri.parse('$_baseUrl/class/$classId/roster'));
+      final response = await http.get(Uri.parse('$_baseUrl/class/$classId/roster'), headers: await _authHeaders());
       if (response.statusCode == 200) {
         return jsonDecode(response.body);
       } else {
@@ -116,7 +128,7 @@ class ApiService {
 
   static Future<List<dynamic>> getAttendanceRecord(int classId) async {
     try {
-      final response = await http.get(Uri.parse('$_baseUrl/class/$classId/attendance'));
+      final response = await http.get(Uri.parse('$_baseUrl/class/$classId/attendance'), headers: await _authHeaders());
       if (response.statusCode == 200) {
         return jsonDecode(response.body);
       } else {
@@ -130,6 +142,7 @@ class ApiService {
   static Future<Map<String, dynamic>> markAttendance(XFile imageFile) async {
     try {
       var request = http.MultipartRequest('POST', Uri.parse('$_baseUrl/mark_attendance'));
+      request.headers.addAll(await _authHeaders());
       request.files.add(await http.MultipartFile.fromPath('attendance_photo', imageFile.path));
       final response = await request.send();
       final responseData = await response.stream.bytesToString();
@@ -144,14 +157,15 @@ class ApiService {
     }
   }
 
-  static Future<Map<String, dynamic>> saveAttendance(int classId, Map<String, bool> attendanceData) async {
+  static Future<Map<String, dynamic>> saveAttendance(int classId, Map<int, bool> attendanceData) async {
     try {
       final response = await http.post(
         Uri.parse('$_baseUrl/save_attendance'),
-        headers: <String, String>{'Content-Type': 'application/json; charset=UTF-8'},
+        headers: await _authHeaders(json: true),
         body: jsonEncode(<String, dynamic>{
           'class_id': classId,
-          'attendance': attendanceData,
+          // Keyed by student id; JSON object keys are strings
+          'attendance': attendanceData.map((id, present) => MapEntry(id.toString(), present)),
         }),
       );
       if (response.statusCode == 200) {